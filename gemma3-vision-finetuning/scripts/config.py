@@ -18,8 +18,18 @@ class LoRAConfig:
 
 class DataConfig:
     DATASET_NAME = "unsloth/LaTeX_OCR"
+    # Hub branch, tag or commit; resolved to a commit sha for the cache key
+    REVISION = "main"
+    SPLIT = "train"
     NUM_SAMPLES = 100
+    # Rows are always fetched by streaming the first NUM_SAMPLES, never the whole split. By
+    # default they are tokenized once into CACHE_DIR; True trains on the stream itself (an
+    # IterableDataset: re-tokenized every run and epoch, no length grouping or padding report)
+    STREAMING = False
     INSTRUCTION = "Write the LaTeX representation for this image."
+    # Tokenized datasets are saved here and memory-mapped on later runs
+    CACHE_DIR = "cache/datasets"
+    NUM_PROC = 4
 
 class TrainerConfig:
     MAX_STEPS = 30
@@ -33,6 +43,14 @@ class TrainerConfig:
     LR_SCHEDULER = "linear"
     SEED = 3407
     REPORT_TO = "none"
+    # Pack several examples into each MAX_SEQ_LENGTH row (text path only)
+    PACKING = False
+    # Examples packed together are chosen from windows of this many rows
+    PACKING_WINDOW = 1000
+    # Without packing, batch examples of similar length to cut padding
+    GROUP_BY_LENGTH = True
+    # Train on image + text through Unsloth's vision collator; images are decoded per batch
+    VISION_COLLATOR = False
 
 class ChatConfig:
     TEMPLATE = "gemma-3"
@@ -44,3 +62,18 @@ class GenerationConfig:
     TEMPERATURE = 1.0
     TOP_P = 0.95
     TOP_K = 64
+    # BatchInference limits: items per batch and left-padded prompt tokens per batch
+    BATCH_SIZE = 8
+    MAX_BATCH_TOKENS = 16384
+
+class EvalConfig:
+    # Held out from training, which reads DataConfig.SPLIT
+    SPLIT = "test"
+    NUM_SAMPLES = 500
+    REPORT_DIR = "eval_reports"
+    NUM_PROC = 4
+    # Below this many pairs, scoring in-process beats starting a pool
+    MIN_PARALLEL_PAIRS = 256
+    BLEU_MAX_ORDER = 4
+    # Reference/prediction pairs copied into the report for eyeballing
+    NUM_EXAMPLES = 20
@@ -1,16 +1,40 @@
-from datasets import load_dataset
-from config import DataConfig
+import hashlib
+import json
+import logging
+import os
+import torch
+from datasets import Dataset, Image, load_dataset, load_from_disk
+from config import ChatConfig, DataConfig, ModelConfig, TrainerConfig
 
-def load_latex_dataset(num_samples=DataConfig.NUM_SAMPLES):
-    dataset = load_dataset(DataConfig.DATASET_NAME, split="train")
-    return dataset.select(range(num_samples))
+logger = logging.getLogger(__name__)
+
+# Decodes images kept as encoded {"bytes", "path"} dicts until collate time
+_image_feature = Image()
+
+def load_latex_dataset(num_samples=DataConfig.NUM_SAMPLES, streaming=True,
+                       split=DataConfig.SPLIT, dataset_name=DataConfig.DATASET_NAME,
+                       revision=DataConfig.REVISION, **kwargs):
+    """Load the first `num_samples` rows with their images left encoded.
+
+    With streaming=True only the rows that are read get downloaded, so start-up
+    time and memory don't grow with num_samples. Extra kwargs go to
+    load_dataset, e.g. dataset_name="parquet", data_files=... for local files.
+    """
+    if streaming:
+        dataset = load_dataset(dataset_name, split=split, streaming=True, revision=revision,
+                               **kwargs).take(num_samples)
+    else:
+        dataset = load_dataset(dataset_name, split=f"{split}[:{num_samples}]", revision=revision, **kwargs)
+    return dataset.cast_column("image", Image(decode=False))
 
 def convert_to_conversation(sample, instruction=DataConfig.INSTRUCTION):
+    # Only a placeholder goes into the messages; the encoded image stays in the
+    # "image" column until LazyImageCollator decodes it for a batch
     conversation = [
         {"role": "user",
          "content": [
              {"type": "text", "text": instruction},
-             {"type": "image", "image": sample["image"]}]
+             {"type": "image"}]
         },
         {"role": "assistant",
          "content": [
@@ -19,13 +43,254 @@ def convert_to_conversation(sample, instruction=DataConfig.INSTRUCTION):
     ]
     return {"messages": conversation}
 
+def decode_image(image):
+    """Decode an encoded {"bytes", "path"} image; PIL images pass through"""
+    if isinstance(image, dict):
+        return _image_feature.decode_example(image)
+    return image
+
+def attach_image(messages, image):
+    """Copy of `messages` with the decoded image in each image part and Arrow's None padding dropped"""
+    image = decode_image(image)
+    attached = []
+    for message in messages:
+        content = []
+        for part in message["content"]:
+            part = {k: v for k, v in part.items() if v is not None}
+            if part.get("type") == "image":
+                part["image"] = image
+            content.append(part)
+        attached.append({**message, "content": content})
+    return attached
+
+class LazyImageCollator:
+    """Decodes a batch's images just before passing it to `collator`, so dataset rows never hold PIL images"""
+
+    def __init__(self, collator):
+        self.collator = collator
+
+    def __call__(self, features):
+        features = [
+            {**feature, "messages": attach_image(feature["messages"], feature["image"])}
+            for feature in features
+        ]
+        return self.collator(features)
+
 def apply_chat_template(examples, tokenizer):
     texts = tokenizer.apply_chat_template(examples["messages"])
     return {"text": texts}
 
-def prepare_dataset(dataset, tokenizer):
-    converted_dataset = dataset.map(convert_to_conversation)
-    return converted_dataset.map(
-        lambda x: apply_chat_template(x, tokenizer), 
-        batched=True
+def tokenize(examples, tokenizer, max_seq_length=ModelConfig.MAX_SEQ_LENGTH):
+    # The chat template already starts with <bos>
+    tokens = tokenizer(examples["text"], add_special_tokens=False, truncation=True, max_length=max_seq_length)
+    # Lets the trainer's length-grouped sampler skip re-reading input_ids
+    tokens["length"] = [len(ids) for ids in tokens["input_ids"]]
+    return tokens
+
+def prepare_dataset(dataset, tokenizer, max_seq_length=ModelConfig.MAX_SEQ_LENGTH, num_proc=None):
+    """Add "messages", templated "text" and tokenized "input_ids" to each row.
+
+    Works on a Dataset or a streaming IterableDataset. For the latter, rows are
+    mapped as they are read and num_proc is ignored.
+    """
+    # A vision processor wraps the text tokenizer; the chat template lives on the outer object
+    text_tokenizer = getattr(tokenizer, "tokenizer", tokenizer)
+    map_args = {"num_proc": num_proc} if isinstance(dataset, Dataset) else {}
+    converted_dataset = dataset.map(convert_to_conversation, **map_args)
+    templated_dataset = converted_dataset.map(
+        lambda x: apply_chat_template(x, tokenizer),
+        batched=True,
+        **map_args,
+    )
+    return templated_dataset.map(
+        lambda x: tokenize(x, text_tokenizer, max_seq_length),
+        batched=True,
+        **map_args,
+    )
+
+def pack_examples(examples, max_seq_length=ModelConfig.MAX_SEQ_LENGTH):
+    """First-fit-decreasing packing of a batch of tokenized, labelled examples.
+
+    Each packed row concatenates whole examples. position_ids restart at 0 for
+    every example (PackedCollator finds the boundaries from them), and the
+    first label of each example is masked so no token is trained to predict
+    the start of the next example.
+    """
+    input_ids, labels = examples["input_ids"], examples["labels"]
+    order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]), reverse=True)
+    rows = []  # [free space, member indices]
+    for i in order:
+        size = len(input_ids[i])
+        for row in rows:
+            if row[0] >= size:
+                row[0] -= size
+                row[1].append(i)
+                break
+        else:
+            rows.append([max_seq_length - size, [i]])
+
+    packed = {"input_ids": [], "labels": [], "position_ids": [], "length": []}
+    for _, members in rows:
+        row_ids, row_labels, row_positions = [], [], []
+        for i in members:
+            row_ids += input_ids[i]
+            row_labels += [-100] + list(labels[i][1:])
+            row_positions += range(len(input_ids[i]))
+        packed["input_ids"].append(row_ids)
+        packed["labels"].append(row_labels)
+        packed["position_ids"].append(row_positions)
+        packed["length"].append(len(row_ids))
+    return packed
+
+def pack_dataset(dataset, max_seq_length=ModelConfig.MAX_SEQ_LENGTH, window=TrainerConfig.PACKING_WINDOW):
+    """Pack a tokenized dataset that already has labels; works on streaming datasets too"""
+    return dataset.map(
+        lambda x: pack_examples(x, max_seq_length),
+        batched=True,
+        batch_size=window,
+        remove_columns=list(dataset.column_names or next(iter(dataset)).keys()),
     )
+
+class PackedCollator:
+    """Pads packed rows and keeps examples in the same row from attending to each other.
+
+    With block_mask=True each row gets a 4D block-diagonal causal mask (eager
+    and SDPA attention). Given a `sliding_window`, as Gemma-3 uses for most
+    layers, the mask is a dict with a separate windowed mask for those layers.
+    With block_mask=False the batch is flattened into one row with no
+    attention_mask, and flash attention splits it on the position_ids resets.
+    """
+
+    def __init__(self, pad_token_id, block_mask=True, dtype=torch.float32, sliding_window=None):
+        self.pad_token_id = pad_token_id
+        self.block_mask = block_mask
+        self.dtype = dtype
+        self.sliding_window = sliding_window
+
+    def _additive(self, allowed):
+        mask = torch.zeros(allowed.shape, dtype=self.dtype)
+        return mask.masked_fill_(~allowed, torch.finfo(self.dtype).min).unsqueeze(1)
+
+    def __call__(self, features):
+        if not self.block_mask:
+            return {
+                key: torch.tensor([sum((list(f[key]) for f in features), [])])
+                for key in ("input_ids", "labels", "position_ids")
+            }
+
+        width = max(len(f["input_ids"]) for f in features)
+        batch = len(features)
+        input_ids = torch.full((batch, width), self.pad_token_id, dtype=torch.long)
+        labels = torch.full((batch, width), -100, dtype=torch.long)
+        position_ids = torch.zeros((batch, width), dtype=torch.long)
+        # Padding positions only see themselves so softmax never gets an all-masked row
+        allowed = torch.eye(width, dtype=torch.bool).repeat(batch, 1, 1)
+        for b, feature in enumerate(features):
+            positions = torch.tensor(feature["position_ids"], dtype=torch.long)
+            n = len(positions)
+            input_ids[b, :n] = torch.tensor(feature["input_ids"], dtype=torch.long)
+            labels[b, :n] = torch.tensor(feature["labels"], dtype=torch.long)
+            position_ids[b, :n] = positions
+            starts = (positions == 0).nonzero().flatten().tolist() + [n]
+            for start, end in zip(starts, starts[1:]):
+                allowed[b, start:end, start:end] = torch.ones(end - start, end - start, dtype=torch.bool).tril()
+
+        attention_mask = self._additive(allowed)
+        if self.sliding_window:
+            offsets = torch.arange(width)[:, None] - torch.arange(width)[None, :]
+            attention_mask = {
+                "full_attention": attention_mask,
+                "sliding_attention": self._additive(allowed & (offsets < self.sliding_window)),
+            }
+        return {"input_ids": input_ids, "labels": labels, "position_ids": position_ids,
+                "attention_mask": attention_mask}
+
+def padding_efficiency(lengths, batch_size, order):
+    """Real tokens / padded tokens when batches of `order` are padded to their longest example"""
+    real = total = 0
+    for i in range(0, len(order), batch_size):
+        batch = [lengths[j] for j in order[i:i + batch_size]]
+        real += sum(batch)
+        total += max(batch) * len(batch)
+    return real / total if total else 1.0
+
+def batch_order(lengths, batch_size, grad_accum_steps=1, group_by_length=TrainerConfig.GROUP_BY_LENGTH,
+                seed=TrainerConfig.SEED):
+    """Example order the Trainer's sampler produces: length-grouped mega-batches, or a plain shuffle"""
+    from transformers.trainer_pt_utils import LengthGroupedSampler
+    generator = torch.Generator().manual_seed(seed)
+    if group_by_length:
+        return list(LengthGroupedSampler(batch_size * grad_accum_steps, lengths=lengths, generator=generator))
+    return torch.randperm(len(lengths), generator=generator).tolist()
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def tokenizer_fingerprint(tokenizer):
+    """Hash of the tokenizer's source, settings, special tokens and chat template.
+
+    The vocabulary itself isn't serialized (Gemma-3 has ~262k entries);
+    when the tokenizer was loaded from a local directory its tokenizer.json
+    is hashed instead.
+    """
+    text_tokenizer = getattr(tokenizer, "tokenizer", tokenizer)
+    tokenizer_file = os.path.join(text_tokenizer.name_or_path, "tokenizer.json")
+    payload = json.dumps({
+        "class": type(text_tokenizer).__name__,
+        "name_or_path": text_tokenizer.name_or_path,
+        "tokenizer_file": _file_sha256(tokenizer_file) if os.path.isfile(tokenizer_file) else None,
+        "init_kwargs": text_tokenizer.init_kwargs,
+        "size": len(text_tokenizer),
+        "special_tokens": text_tokenizer.all_special_tokens,
+        "chat_template": getattr(tokenizer, "chat_template", None) or text_tokenizer.chat_template,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def dataset_revision(dataset_name=DataConfig.DATASET_NAME, revision=DataConfig.REVISION):
+    """Commit sha of the dataset on the Hub, or the configured revision when it can't be resolved (offline)"""
+    try:
+        from huggingface_hub import HfApi
+        return HfApi().dataset_info(dataset_name, revision=revision).sha
+    except Exception as e:
+        logger.warning("Could not resolve %s@%s to a commit (%s); the dataset cache key uses %r, "
+                       "so an updated dataset won't invalidate it", dataset_name, revision, e, revision)
+        return revision or "unknown"
+
+def cache_key(tokenizer, num_samples=DataConfig.NUM_SAMPLES, max_seq_length=ModelConfig.MAX_SEQ_LENGTH,
+              dataset_name=DataConfig.DATASET_NAME, split=DataConfig.SPLIT, revision=DataConfig.REVISION):
+    """Fingerprint of everything that changes the tokenized dataset"""
+    payload = json.dumps({
+        "tokenizer": tokenizer_fingerprint(tokenizer),
+        "template": ChatConfig.TEMPLATE,
+        "instruction": DataConfig.INSTRUCTION,
+        "dataset": dataset_name,
+        "split": split,
+        "revision": dataset_revision(dataset_name, revision),
+        "num_samples": num_samples,
+        "max_seq_length": max_seq_length,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def load_prepared_dataset(tokenizer, num_samples=DataConfig.NUM_SAMPLES, max_seq_length=ModelConfig.MAX_SEQ_LENGTH,
+                          cache_dir=DataConfig.CACHE_DIR, num_proc=DataConfig.NUM_PROC, split=DataConfig.SPLIT):
+    """Tokenized dataset from the on-disk cache, building it on a process pool the first time.
+
+    The cache is an Arrow dataset that load_from_disk memory-maps, so later
+    runs start without re-templating or copying rows into memory.
+    """
+    path = os.path.join(cache_dir, f"{split}-{cache_key(tokenizer, num_samples, max_seq_length, split=split)}")
+    if not os.path.isdir(path):
+        # Stream just the rows needed rather than downloading and preparing the whole split
+        rows = load_latex_dataset(num_samples, streaming=True, split=split)
+        dataset = Dataset.from_list(list(rows), features=rows.features)
+        prepared = prepare_dataset(dataset, tokenizer, max_seq_length, num_proc=num_proc)
+        # Save under a temporary name so an interrupted build is never loaded
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        prepared.save_to_disk(tmp_path)
+        os.replace(tmp_path, path)
+        print(f"Cached tokenized dataset at {path}")
+    return load_from_disk(path)
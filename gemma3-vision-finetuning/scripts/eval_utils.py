@@ -0,0 +1,189 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from multiprocessing import Pool
+import numpy as np
+from config import DataConfig, EvalConfig, GenerationConfig, ModelConfig
+from data_utils import load_latex_dataset
+from inference import BatchInference
+
+# LaTeX commands, escaped characters, then any other single non-space character
+LATEX_TOKEN = re.compile(r"\\[A-Za-z]+|\\.|\S")
+
+def normalize(text):
+    """Collapse whitespace, which LaTeX mostly ignores"""
+    return " ".join(text.split())
+
+def edit_distance(a, b):
+    """Levenshtein distance with one vectorized NumPy pass per character of `a`.
+
+    Within a row the insertion chain cur[j] = min(cur[j], cur[j-1] + 1) is a
+    running minimum of cur[k] - k, shifted back by j.
+    """
+    if not a or not b:
+        return max(len(a), len(b))
+    b_codes = np.frombuffer(b.encode("utf-32-le"), dtype=np.uint32)
+    offsets = np.arange(len(b) + 1)
+    prev = offsets.copy()
+    for i, ch in enumerate(a, start=1):
+        cost = (b_codes != ord(ch)).astype(np.int64)
+        cur = np.empty_like(prev)
+        cur[0] = i
+        cur[1:] = np.minimum(prev[1:] + 1, prev[:-1] + cost)
+        prev = np.minimum.accumulate(cur - offsets) + offsets
+    return int(prev[-1])
+
+def ngram_stats(prediction, reference, max_order=EvalConfig.BLEU_MAX_ORDER):
+    """Clipped n-gram matches and totals for corpus BLEU, over LaTeX tokens"""
+    pred_tokens = LATEX_TOKEN.findall(prediction)
+    ref_tokens = LATEX_TOKEN.findall(reference)
+    matches, totals = [], []
+    for n in range(1, max_order + 1):
+        pred_ngrams = Counter(tuple(pred_tokens[i:i + n]) for i in range(len(pred_tokens) - n + 1))
+        ref_ngrams = Counter(tuple(ref_tokens[i:i + n]) for i in range(len(ref_tokens) - n + 1))
+        matches.append(sum((pred_ngrams & ref_ngrams).values()))
+        totals.append(max(len(pred_tokens) - n + 1, 0))
+    return matches, totals, len(pred_tokens), len(ref_tokens)
+
+def score_pair(pair):
+    prediction, reference = normalize(pair[0]), normalize(pair[1])
+    edits = edit_distance(prediction, reference)
+    return {
+        "exact": prediction == reference,
+        "edits": edits,
+        "ref_chars": len(reference),
+        "normalized_edit_distance": edits / max(len(prediction), len(reference), 1),
+        "ngrams": ngram_stats(prediction, reference),
+    }
+
+def corpus_bleu(ngrams, max_order=EvalConfig.BLEU_MAX_ORDER):
+    matches = np.sum([m for m, _, _, _ in ngrams], axis=0)
+    totals = np.sum([t for _, t, _, _ in ngrams], axis=0)
+    pred_len = sum(p for _, _, p, _ in ngrams)
+    ref_len = sum(r for _, _, _, r in ngrams)
+    if pred_len == 0 or np.any(matches == 0):
+        return 0.0
+    log_precision = np.mean(np.log(matches / totals))
+    brevity = 1.0 if pred_len > ref_len else math.exp(1 - ref_len / pred_len)
+    return float(brevity * math.exp(log_precision))
+
+def score(predictions, references, num_proc=EvalConfig.NUM_PROC):
+    """Exact match, CER, mean normalized edit distance and corpus BLEU; pairs are scored on a process pool"""
+    pairs = list(zip(predictions, references))
+    if num_proc > 1 and len(pairs) >= EvalConfig.MIN_PARALLEL_PAIRS:
+        with Pool(num_proc) as pool:
+            rows = pool.map(score_pair, pairs, chunksize=max(1, len(pairs) // (num_proc * 4)))
+    else:
+        rows = [score_pair(pair) for pair in pairs]
+    if not rows:
+        return {}
+    return {
+        "exact_match": float(np.mean([r["exact"] for r in rows])),
+        "cer": sum(r["edits"] for r in rows) / max(sum(r["ref_chars"] for r in rows), 1),
+        "normalized_edit_distance": float(np.mean([r["normalized_edit_distance"] for r in rows])),
+        "bleu": corpus_bleu([r["ngrams"] for r in rows]),
+    }
+
+def latency_summary(values):
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"mean": float(values.mean()), "p50": float(p50), "p90": float(p90), "p99": float(p99),
+            "max": float(values.max())}
+
+def run_eval(model, tokenizer, checkpoint, num_samples=EvalConfig.NUM_SAMPLES, split=EvalConfig.SPLIT,
+             batch_size=GenerationConfig.BATCH_SIZE, max_new_tokens=GenerationConfig.MAX_NEW_TOKENS,
+             num_proc=EvalConfig.NUM_PROC):
+    """Greedy-decode a held-out split and return the report dict"""
+    dataset = load_latex_dataset(num_samples, streaming=True, split=split)
+    references = []
+
+    def pairs():
+        for row in dataset:
+            references.append(row["text"])
+            yield row["image"], DataConfig.INSTRUCTION
+
+    engine = BatchInference(model, tokenizer, batch_size=batch_size, max_new_tokens=max_new_tokens,
+                            do_sample=False)
+    results, throughput = engine.run(pairs())
+    predictions = [r["text"] for r in results]
+
+    # Every item in a batch shares its batch's latency; count each batch once
+    batch_latencies, i = [], 0
+    while i < len(results):
+        batch_latencies.append(results[i]["latency"])
+        i += results[i]["batch_size"]
+
+    # Adapter settings of the checkpoint itself; None for merged or base models
+    lora = getattr(model, "peft_config", {}).get("default")
+    return {
+        "checkpoint": checkpoint,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "dataset": DataConfig.DATASET_NAME,
+            "split": split,
+            "samples": len(results),
+            "base_model": ModelConfig.NAME,
+            # What was actually loaded; load_model only quantizes on CUDA
+            "load_in_4bit": bool(getattr(model, "is_loaded_in_4bit", False)),
+            "lora_r": lora.r if lora else None,
+            "lora_alpha": lora.lora_alpha if lora else None,
+            "max_new_tokens": max_new_tokens,
+            "batch_size": batch_size,
+            "decoding": "greedy",
+        },
+        "metrics": score(predictions, references, num_proc),
+        "latency_seconds": {
+            "batch": latency_summary(batch_latencies),
+            "per_item": latency_summary([r["latency"] / r["batch_size"] for r in results]),
+        },
+        "throughput": throughput,
+        "examples": [
+            {"reference": ref, "prediction": pred}
+            for ref, pred in zip(references[:EvalConfig.NUM_EXAMPLES], predictions)
+        ],
+    }
+
+def write_report(report, path=None):
+    if path is None:
+        name = os.path.basename(os.path.normpath(report["checkpoint"]))
+        stamp = report["created"].replace(":", "").replace("-", "")
+        path = os.path.join(EvalConfig.REPORT_DIR, f"{name}_{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+def compare_reports(paths):
+    """Side-by-side table of the headline numbers from several reports"""
+    reports = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            reports.append(json.load(f))
+    rows = [
+        ("exact_match", lambda r: r["metrics"].get("exact_match")),
+        ("cer", lambda r: r["metrics"].get("cer")),
+        ("normalized_edit_distance", lambda r: r["metrics"].get("normalized_edit_distance")),
+        ("bleu", lambda r: r["metrics"].get("bleu")),
+        ("item_latency_p50", lambda r: r["latency_seconds"]["per_item"].get("p50")),
+        ("item_latency_p90", lambda r: r["latency_seconds"]["per_item"].get("p90")),
+        ("tokens_per_second", lambda r: r["throughput"]["tokens_per_second"]),
+        ("items_per_second", lambda r: r["throughput"]["items_per_second"]),
+        ("lora_r", lambda r: r["config"]["lora_r"]),
+        ("load_in_4bit", lambda r: r["config"]["load_in_4bit"]),
+        ("max_new_tokens", lambda r: r["config"]["max_new_tokens"]),
+    ]
+    names = [os.path.basename(p) for p in paths]
+    width = max(len(name) for name, _ in rows)
+    lines = [" " * width + "  " + "  ".join(f"{n:>24}" for n in names)]
+    for name, get in rows:
+        cells = []
+        for report in reports:
+            value = get(report)
+            cells.append(f"{value:>24.4f}" if isinstance(value, float) else f"{str(value):>24}")
+        lines.append(f"{name:<{width}}  " + "  ".join(cells))
+    return "\n".join(lines)
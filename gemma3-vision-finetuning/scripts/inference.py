@@ -1,33 +1,68 @@
+import time
+import torch
 from transformers import TextStreamer
-from config import GenerationConfig
+from config import GenerationConfig, ModelConfig
+from data_utils import decode_image
 
-def generate_response(model, tokenizer, image=None, text="", 
-                     max_new_tokens=GenerationConfig.MAX_NEW_TOKENS, stream=False):
+def pick_device():
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+def pick_dtype(device):
+    if device == "cuda":
+        return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    if device == "mps":
+        return torch.float16
+    return torch.float32
+
+def load_model(model_path="gemma-3", device=None):
+    """Load a saved model for inference: Unsloth 4-bit on CUDA, plain transformers elsewhere"""
+    device = device or pick_device()
+    if device == "cuda":
+        from unsloth import FastModel
+        model, tokenizer = FastModel.from_pretrained(
+            model_name=model_path,
+            max_seq_length=ModelConfig.MAX_SEQ_LENGTH,
+            load_in_4bit=ModelConfig.LOAD_IN_4BIT,
+        )
+        FastModel.for_inference(model)
+        return model, tokenizer
+    from transformers import AutoModelForImageTextToText, AutoProcessor
+    model = AutoModelForImageTextToText.from_pretrained(model_path, dtype=pick_dtype(device))
+    return model.to(device).eval(), AutoProcessor.from_pretrained(model_path)
+
+def build_messages(text, image=None):
     messages = [{
         "role": "user",
         "content": []
     }]
-    
+
     if image is not None:
         messages[0]["content"].append({
             "type": "image",
             "image": image
         })
-    
+
     messages[0]["content"].append({
         "type": "text",
         "text": text
     })
+    return messages
 
+def generate_response(model, tokenizer, image=None, text="",
+                     max_new_tokens=GenerationConfig.MAX_NEW_TOKENS, stream=False):
     prompt = tokenizer.apply_chat_template(
-        messages,
+        build_messages(text, image),
         add_generation_prompt=True,
     )
 
-    inputs = tokenizer([prompt], return_tensors="pt").to("cuda")
-    
+    inputs = tokenizer([prompt], return_tensors="pt").to(model.device)
+
     streamer = TextStreamer(tokenizer, skip_prompt=True) if stream else None
-    
+
     outputs = model.generate(
         **inputs,
         max_new_tokens=max_new_tokens,
@@ -36,7 +71,135 @@ def generate_response(model, tokenizer, image=None, text="",
         top_k=GenerationConfig.TOP_K,
         streamer=streamer,
     )
-    
+
     if not stream:
         return tokenizer.batch_decode(outputs)
     return None
+
+class BatchInference:
+    """Batched generation over (image, text) pairs on whatever device the model is on.
+
+    Items are grouped into left-padded batches of up to `batch_size` items and
+    `max_batch_tokens` prompt tokens. The templated, tokenized prompt for each
+    distinct instruction is cached, so a fixed instruction is tokenized once
+    and each further item only needs its image preprocessed.
+    """
+
+    def __init__(self, model, tokenizer, batch_size=GenerationConfig.BATCH_SIZE,
+                 max_batch_tokens=GenerationConfig.MAX_BATCH_TOKENS,
+                 max_new_tokens=GenerationConfig.MAX_NEW_TOKENS, **generate_kwargs):
+        self.model = model
+        self.tokenizer = tokenizer
+        # A vision processor wraps the text tokenizer and an image processor
+        self.text_tokenizer = getattr(tokenizer, "tokenizer", tokenizer)
+        self.image_processor = getattr(tokenizer, "image_processor", None)
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.device = model.device
+        self.dtype = model.dtype
+        pad_token_id = self.text_tokenizer.pad_token_id
+        self.pad_token_id = pad_token_id if pad_token_id is not None else self.text_tokenizer.eos_token_id
+        self.generate_kwargs = dict(max_new_tokens=max_new_tokens, pad_token_id=self.pad_token_id)
+        # Sampling settings are only valid when sampling; generate() warns on every batch otherwise
+        if generate_kwargs.get("do_sample", True):
+            self.generate_kwargs.update(
+                temperature=GenerationConfig.TEMPERATURE,
+                top_p=GenerationConfig.TOP_P,
+                top_k=GenerationConfig.TOP_K,
+            )
+        self.generate_kwargs.update(generate_kwargs)
+        self._prefixes = {}
+
+    def _prefix(self, text, image):
+        """Token ids (and token type ids) of the prompt for `text`, with or without an image"""
+        key = (text, image is not None)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            prompt = self.tokenizer.apply_chat_template(build_messages(text, image), add_generation_prompt=True)
+            if image is None:
+                encoded = self.text_tokenizer([prompt], add_special_tokens=False)
+            else:
+                # Only the processor knows how many tokens the image expands to
+                encoded = self.tokenizer(text=[prompt], images=[[image]], add_special_tokens=False)
+            prefix = {k: list(encoded[k][0]) for k in ("input_ids", "token_type_ids") if k in encoded}
+            self._prefixes[key] = prefix
+        return prefix
+
+    def _collate(self, items):
+        prefixes = [self._prefix(text, image) for image, text in items]
+        width = max(len(p["input_ids"]) for p in prefixes)
+        input_ids = torch.full((len(items), width), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(items), width), dtype=torch.long)
+        has_types = all("token_type_ids" in p for p in prefixes)
+        token_type_ids = torch.zeros((len(items), width), dtype=torch.long) if has_types else None
+        for row, prefix in enumerate(prefixes):
+            n = len(prefix["input_ids"])
+            input_ids[row, width - n:] = torch.tensor(prefix["input_ids"])
+            attention_mask[row, width - n:] = 1
+            if has_types:
+                token_type_ids[row, width - n:] = torch.tensor(prefix["token_type_ids"])
+
+        batch = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if has_types:
+            batch["token_type_ids"] = token_type_ids
+        images = [image for image, _ in items if image is not None]
+        if images:
+            pixel_values = self.image_processor(images=images, return_tensors="pt")["pixel_values"]
+            batch["pixel_values"] = pixel_values.to(self.dtype)
+        return {k: v.to(self.device) for k, v in batch.items()}
+
+    def _batches(self, pairs):
+        batch, width = [], 0
+        for image, text in pairs:
+            image = decode_image(image) if image is not None else None
+            size = len(self._prefix(text, image)["input_ids"])
+            if batch and (len(batch) == self.batch_size
+                          or max(width, size) * (len(batch) + 1) > self.max_batch_tokens):
+                yield batch
+                batch, width = [], 0
+            batch.append((image, text))
+            width = max(width, size)
+        if batch:
+            yield batch
+
+    @torch.inference_mode()
+    def run_batch(self, items):
+        """Generate for one list of (image, text) pairs; returns one dict per item"""
+        inputs = self._collate(items)
+        start = time.perf_counter()
+        outputs = self.model.generate(**inputs, **self.generate_kwargs)
+        if self.device.type == "cuda":
+            torch.cuda.synchronize()
+        latency = time.perf_counter() - start
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        counts = (new_tokens != self.pad_token_id).sum(dim=1).tolist()
+        texts = self.text_tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+        return [
+            {"text": text.strip(), "new_tokens": count, "latency": latency, "batch_size": len(items)}
+            for text, count in zip(texts, counts)
+        ]
+
+    def run(self, pairs):
+        """Generate for an iterable of (image, text) pairs; images may be PIL or still encoded.
+
+        Returns the per-item results in input order and throughput stats.
+        """
+        results = []
+        start = time.perf_counter()
+        batches = 0
+        for batch in self._batches(pairs):
+            results += self.run_batch(batch)
+            batches += 1
+        seconds = time.perf_counter() - start
+        tokens = sum(r["new_tokens"] for r in results)
+        stats = {
+            "items": len(results),
+            "batches": batches,
+            "seconds": seconds,
+            "generated_tokens": tokens,
+            "items_per_second": len(results) / seconds if seconds else 0.0,
+            "tokens_per_second": tokens / seconds if seconds else 0.0,
+            "device": str(self.device),
+            "dtype": str(self.dtype),
+        }
+        return results, stats
@@ -1,17 +1,23 @@
-from model_utils import initialize_model, add_lora_adapters, setup_tokenizer
-from data_utils import load_latex_dataset, prepare_dataset
-from trainer import setup_trainer
+import argparse
+from config import DataConfig, EvalConfig, GenerationConfig
 import torch
 
-def main():
+def train():
+    from model_utils import initialize_model, add_lora_adapters, setup_tokenizer
+    from data_utils import load_latex_dataset, load_prepared_dataset, prepare_dataset
+    from trainer import setup_trainer
+
     # Initialize model and tokenizer
     model, tokenizer = initialize_model()
     model = add_lora_adapters(model)
     tokenizer = setup_tokenizer(tokenizer)
     
-    # Prepare dataset
-    dataset = load_latex_dataset(num_samples=100)
-    train_dataset = prepare_dataset(dataset, tokenizer)
+    # Prepare dataset: by default the taken rows are tokenized once into a map-style
+    # dataset memory-mapped from the cache; STREAMING opts into tokenizing on the fly
+    if DataConfig.STREAMING:
+        train_dataset = prepare_dataset(load_latex_dataset(), tokenizer)
+    else:
+        train_dataset = load_prepared_dataset(tokenizer)
     
     # Setup and run training
     trainer = setup_trainer(model, tokenizer, train_dataset)
@@ -24,5 +30,48 @@ def main():
     # Print training stats
     print(f"Training completed in {trainer_stats.metrics['train_runtime']} seconds")
 
+def evaluate(args):
+    # Imported here so evaluation works on machines without Unsloth (e.g. CPU only)
+    from inference import load_model
+    from eval_utils import run_eval, write_report
+
+    model, tokenizer = load_model(args.model, device=args.device)
+    report = run_eval(model, tokenizer, checkpoint=args.model, num_samples=args.samples, split=args.split,
+                      batch_size=args.batch_size, max_new_tokens=args.max_new_tokens, num_proc=args.num_proc)
+    path = write_report(report, args.output)
+    metrics, throughput = report["metrics"], report["throughput"]
+    print(f"Exact match {metrics['exact_match']:.2%}  CER {metrics['cer']:.4f}  BLEU {metrics['bleu']:.4f}")
+    print(f"{throughput['items_per_second']:.2f} items/s, {throughput['tokens_per_second']:.1f} tokens/s "
+          f"on {throughput['device']}; per-item latency p50 {report['latency_seconds']['per_item']['p50']:.3f}s")
+    print(f"Report written to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tune and evaluate Gemma-3 on LaTeX OCR")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("train", help="Fine-tune with LoRA and save to ./gemma-3 (default)")
+
+    eval_parser = commands.add_parser("eval", help="Score a checkpoint on a held-out split")
+    eval_parser.add_argument("--model", default="gemma-3", help="Checkpoint directory or Hub id")
+    eval_parser.add_argument("--split", default=EvalConfig.SPLIT)
+    eval_parser.add_argument("--samples", type=int, default=EvalConfig.NUM_SAMPLES)
+    eval_parser.add_argument("--batch-size", type=int, default=GenerationConfig.BATCH_SIZE)
+    eval_parser.add_argument("--max-new-tokens", type=int, default=GenerationConfig.MAX_NEW_TOKENS)
+    eval_parser.add_argument("--num-proc", type=int, default=EvalConfig.NUM_PROC,
+                             help="Processes used to score predictions")
+    eval_parser.add_argument("--device", choices=["cuda", "mps", "cpu"], help="Default: best available")
+    eval_parser.add_argument("--output", help=f"Report path (default: {EvalConfig.REPORT_DIR}/<model>_<time>.json)")
+
+    compare_parser = commands.add_parser("compare", help="Print eval reports side by side")
+    compare_parser.add_argument("reports", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "eval":
+        evaluate(args)
+    elif args.command == "compare":
+        from eval_utils import compare_reports
+        print(compare_reports(args.reports))
+    else:
+        train()
+
 if __name__ == "__main__":
     main()
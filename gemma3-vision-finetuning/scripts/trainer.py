@@ -1,14 +1,65 @@
+from datasets import Dataset
+from transformers import TrainerCallback
 from trl import SFTTrainer, SFTConfig
 from unsloth.chat_templates import train_on_responses_only
-from config import TrainerConfig, ChatConfig
+from config import ModelConfig, TrainerConfig, ChatConfig
+from data_utils import LazyImageCollator, PackedCollator, batch_order, pack_dataset, padding_efficiency
+
+def report_padding_efficiency(trainer):
+    dataset = trainer.train_dataset
+    if not isinstance(dataset, Dataset):
+        print("Padding efficiency: not measured for a streaming dataset (DataConfig.STREAMING)")
+        return None
+    if isinstance(trainer.data_collator, PackedCollator) and not trainer.data_collator.block_mask:
+        print("Padding efficiency: 100.0% (packed rows are flattened, no padding)")
+        return 1.0
+    lengths = dataset["length"] if "length" in dataset.column_names else [len(x) for x in dataset["input_ids"]]
+    args = trainer.args
+    batch_size = args.per_device_train_batch_size
+    order = batch_order(lengths, batch_size, args.gradient_accumulation_steps, args.group_by_length, args.seed)
+    random_order = batch_order(lengths, batch_size, seed=args.seed, group_by_length=False)
+    efficiency = padding_efficiency(lengths, batch_size, order)
+    print(f"Padding efficiency: {efficiency:.1%} real tokens over {len(lengths)} rows "
+          f"(random batches: {padding_efficiency(lengths, batch_size, random_order):.1%})")
+    return efficiency
+
+class PaddingEfficiencyCallback(TrainerCallback):
+    def __init__(self, trainer):
+        self.trainer = trainer
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        report_padding_efficiency(self.trainer)
+
+def setup_trainer(model, tokenizer, train_dataset, max_steps=TrainerConfig.MAX_STEPS,
+                  vision=TrainerConfig.VISION_COLLATOR, packing=TrainerConfig.PACKING):
+    if vision and packing:
+        raise ValueError("Packing is only supported for the text path, not VISION_COLLATOR")
+    if vision:
+        # Images are decoded per batch from the encoded "image" column, and the
+        # collator masks the prompt tokens itself
+        from unsloth.trainer import UnslothVisionDataCollator
+        data_collator = LazyImageCollator(UnslothVisionDataCollator(
+            model, tokenizer,
+            train_on_responses_only=True,
+            instruction_part=ChatConfig.INSTRUCTION_PART,
+            response_part=ChatConfig.RESPONSE_PART,
+        ))
+        dataset_args = dict(
+            dataset_text_field="",
+            remove_unused_columns=False,
+            dataset_kwargs={"skip_prepare_dataset": True},
+        )
+    else:
+        data_collator = None
+        dataset_args = dict(dataset_text_field="text")
 
-def setup_trainer(model, tokenizer, train_dataset, max_steps=TrainerConfig.MAX_STEPS):
     trainer = SFTTrainer(
         model=model,
         tokenizer=tokenizer,
         train_dataset=train_dataset,
+        data_collator=data_collator,
         args=SFTConfig(
-            dataset_text_field="text",
+            **dataset_args,
             per_device_train_batch_size=TrainerConfig.BATCH_SIZE,
             gradient_accumulation_steps=TrainerConfig.GRAD_ACCUM_STEPS,
             warmup_steps=TrainerConfig.WARMUP_STEPS,
@@ -20,11 +71,27 @@ def setup_trainer(model, tokenizer, train_dataset, max_steps=TrainerConfig.MAX_S
             lr_scheduler_type=TrainerConfig.LR_SCHEDULER,
             seed=TrainerConfig.SEED,
             report_to=TrainerConfig.REPORT_TO,
+            # Packed rows are already about the same length
+            group_by_length=TrainerConfig.GROUP_BY_LENGTH and not packing,
         ),
     )
-    
-    return train_on_responses_only(
-        trainer,
-        instruction_part=ChatConfig.INSTRUCTION_PART,
-        response_part=ChatConfig.RESPONSE_PART,
-    )
+
+    if not vision:
+        trainer = train_on_responses_only(
+            trainer,
+            instruction_part=ChatConfig.INSTRUCTION_PART,
+            response_part=ChatConfig.RESPONSE_PART,
+        )
+    if packing:
+        # Pack after masking so each example keeps its own response-only labels
+        trainer.train_dataset = pack_dataset(trainer.train_dataset, ModelConfig.MAX_SEQ_LENGTH)
+        text_tokenizer = getattr(tokenizer, "tokenizer", tokenizer)
+        text_config = getattr(model.config, "text_config", model.config)
+        trainer.data_collator = PackedCollator(
+            text_tokenizer.pad_token_id,
+            block_mask=getattr(model.config, "_attn_implementation", None) != "flash_attention_2",
+            dtype=model.dtype,
+            sliding_window=getattr(text_config, "sliding_window", None),
+        )
+    trainer.add_callback(PaddingEfficiencyCallback(trainer))
+    return trainer
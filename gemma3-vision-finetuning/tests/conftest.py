@@ -0,0 +1,52 @@
+import io
+import os
+import sys
+
+import pytest
+
+# The scripts are run from their own directory and import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+
+class FakeTokenizer:
+    """Character-level stand-in for the Gemma-3 processor: enough for templating and tokenizing"""
+
+    name_or_path = "fake-tokenizer"
+    init_kwargs = {}
+    all_special_tokens = ["<pad>"]
+    chat_template = "fake"
+    pad_token_id = 0
+
+    def __len__(self):
+        return 256
+
+    def apply_chat_template(self, conversations):
+        return ["".join(part.get("text") or "<img>" for message in messages for part in message["content"])
+                for messages in conversations]
+
+    def __call__(self, texts, add_special_tokens=False, truncation=False, max_length=None):
+        ids = [[ord(c) % 255 + 1 for c in text][:max_length] for text in texts]
+        return {"input_ids": ids, "attention_mask": [[1] * len(x) for x in ids]}
+
+
+@pytest.fixture
+def fake_tokenizer():
+    return FakeTokenizer()
+
+
+@pytest.fixture
+def latex_parquet(tmp_path):
+    """A small LaTeX_OCR-shaped Parquet file with encoded images and targets of varied length"""
+    from datasets import Dataset, Features, Image, Value
+    from PIL import Image as PILImage
+
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (8, 8)).save(buffer, format="PNG")
+    texts = [" + ".join(f"x_{j}" for j in range(1 + (i * 7) % 23)) for i in range(40)]
+    dataset = Dataset.from_dict(
+        {"image": [{"bytes": buffer.getvalue(), "path": None}] * len(texts), "text": texts},
+        features=Features({"image": Image(), "text": Value("string")}),
+    )
+    path = str(tmp_path / "latex.parquet")
+    dataset.to_parquet(path)
+    return path
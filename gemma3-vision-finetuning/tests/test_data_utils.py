@@ -0,0 +1,54 @@
+import data_utils
+
+
+def use_local_dataset(monkeypatch, path):
+    """Point load_latex_dataset at a local Parquet file and pin the revision so nothing hits the Hub"""
+    load = data_utils.load_latex_dataset
+    monkeypatch.setattr(data_utils, "load_latex_dataset",
+                        lambda *args, **kwargs: load(*args, dataset_name="parquet", data_files=path, **kwargs))
+    monkeypatch.setattr(data_utils, "dataset_revision", lambda *args, **kwargs: "pinned")
+
+
+def test_second_load_hits_the_cache(monkeypatch, tmp_path, fake_tokenizer, latex_parquet):
+    use_local_dataset(monkeypatch, latex_parquet)
+    prepare = data_utils.prepare_dataset
+    calls = []
+    monkeypatch.setattr(data_utils, "prepare_dataset", lambda *a, **k: calls.append(1) or prepare(*a, **k))
+    cache_dir = str(tmp_path / "cache")
+
+    first = data_utils.load_prepared_dataset(fake_tokenizer, num_samples=16, cache_dir=cache_dir, num_proc=1)
+    assert len(calls) == 1
+    assert len(first) == 16 and "input_ids" in first.column_names
+
+    # A second run must neither fetch rows nor template/tokenize them again
+    monkeypatch.setattr(data_utils, "load_latex_dataset", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    second = data_utils.load_prepared_dataset(fake_tokenizer, num_samples=16, cache_dir=cache_dir, num_proc=1)
+    assert len(calls) == 1
+    assert second._fingerprint == first._fingerprint
+    assert second["input_ids"] == first["input_ids"]
+
+
+def test_cache_key_changes_with_what_shapes_the_data(monkeypatch, fake_tokenizer):
+    monkeypatch.setattr(data_utils, "dataset_revision", lambda *args, **kwargs: "pinned")
+    key = data_utils.cache_key(fake_tokenizer, num_samples=16)
+    assert data_utils.cache_key(fake_tokenizer, num_samples=16) == key
+    assert data_utils.cache_key(fake_tokenizer, num_samples=32) != key
+    fake_tokenizer.chat_template = "changed"
+    assert data_utils.cache_key(fake_tokenizer, num_samples=16) != key
+
+
+def test_length_grouping_pads_less_than_random_batches(monkeypatch, tmp_path, fake_tokenizer, latex_parquet):
+    use_local_dataset(monkeypatch, latex_parquet)
+    dataset = data_utils.load_prepared_dataset(fake_tokenizer, num_samples=40, cache_dir=str(tmp_path), num_proc=1)
+    lengths = dataset["length"]
+    assert len(set(lengths)) > 1
+
+    grouped = data_utils.batch_order(lengths, batch_size=2, grad_accum_steps=4, group_by_length=True)
+    shuffled = data_utils.batch_order(lengths, batch_size=2, group_by_length=False)
+    assert sorted(grouped) == sorted(shuffled) == list(range(len(lengths)))
+    assert data_utils.padding_efficiency(lengths, 2, grouped) > data_utils.padding_efficiency(lengths, 2, shuffled)
+
+
+def test_padding_efficiency_counts_real_over_padded_tokens():
+    # Batches [4, 2] and [3, 3]: 12 real tokens over 8 + 6 padded slots
+    assert data_utils.padding_efficiency([4, 2, 3, 3], 2, [0, 1, 2, 3]) == 12 / 14
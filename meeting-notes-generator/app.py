@@ -1,33 +1,132 @@
-import gradio as gr
+import asyncio
+import logging
 import os
+import threading
+import time
 from datetime import datetime
-from audio_recorder import start_recording, stop_recording
-from transcribe_audio import transcribe_audio
-from mom_generator import generate_minutes, save_minutes
+from audio_recorder import Recorder
+from job_queue import QUEUED, QueueFull
+from live_transcriber import LiveTranscriber
+from diarization import DIARIZATION_ENABLED
+from transcribe_audio import atranscribe_audio, save_speaker_timeline
+from mom_generator import agenerate_minutes_stream, get_client, save_minutes
+from model_registry import registry
+from search_index import KINDS, format_hits, get_search_index
+import tracing
+
+logger = logging.getLogger(__name__)
 
 # Add this constant at the top level
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+# Load models and clients in the background at startup instead of on first request
+WARM_UP = os.environ.get("WARM_UP", "1") != "0"
+# How often a running transcription reports progress to the browser
+POLL_SECONDS = 0.25
+# Recorder default output directory; transcripts are saved next to the recordings
+RECORDINGS_DIR = "recordings"
+
+
+class Session:
+    """Per-browser-session state, kept in gr.State so users don't share recordings"""
+
+    def __init__(self):
+        self.recorder = None
+        self.live_transcriber = None
+
+def record_audio(session):
+    """Start recording and stream the live transcript until recording stops"""
+    import gradio as gr
+
+    session = session or Session()
+    if session.recorder is not None and session.recorder.recording:
+        yield session, "Already recording.", gr.update()
+        return
+    session.recorder = Recorder()
+    session.live_transcriber = LiveTranscriber(session.recorder)
+    session.recorder.start()
+    session.live_transcriber.start()
+    yield session, "Recording started... Click 'Stop Recording' when finished.", ""
+
+    for partial in session.live_transcriber.iter_text():
+        yield session, "Recording... transcript updates as you speak.", partial
+
+    transcription, segments = session.live_transcriber.wait()
+    status = f"Recording saved to: {session.recorder.path}"
+    if not session.live_transcriber.complete:
+        status += " (live transcription fell behind and skipped audio; use Transcribe for the full text)"
+    elif DIARIZATION_ENABLED:
+        # The live text is flat; swap in the speaker timeline, as Transcribe would show
+        yield session, status + "; identifying speakers...", transcription
+        try:
+            transcription = save_speaker_timeline(session.recorder.path, segments)
+        except Exception:
+            logger.exception("Diarization failed for %s", session.recorder.path)
+    yield session, status, transcription
 
-def record_audio():
-    start_recording()
-    return "Recording started... Click 'Stop Recording' when finished."
+def stop_audio_recording(session):
+    if session is None or session.recorder is None:
+        return "", "No recording in progress."
+    audio_file = session.recorder.stop()
+    return audio_file, "Finishing the last part of the transcript..."
 
-def stop_audio_recording():
-    audio_file = stop_recording()
-    return audio_file, f"Recording saved to: {audio_file}"
+async def process_audio(session, audio_file):
+    """Transcribe off the event loop; a disconnect or Cancel cancels this generator and the transcription"""
+    import gradio as gr
 
-def process_audio(audio_file):
+    session = session or Session()
     if not audio_file:
-        return "Please record audio first!", ""
-    
-    transcription = transcribe_audio(audio_file)
-    return transcription, "Transcription complete!"
+        yield session, "Please record audio first!", ""
+        return
+
+    state = {"progress": None, "job": None}
+    task = asyncio.ensure_future(
+        atranscribe_audio(audio_file, progress=lambda fraction: state.update(progress=fraction),
+                          on_submit=lambda job: state.update(job=job), speakers=DIARIZATION_ENABLED)
+    )
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=POLL_SECONDS)
+            if not task.done():
+                job = state["job"]
+                if job is not None and job.status == QUEUED:
+                    status = f"Queued for transcription (position {job.position or 1})"
+                elif state["progress"] is None:
+                    status = "Starting transcription..."
+                else:
+                    status = f"Transcribing... {state['progress']:.0%}"
+                yield session, gr.update(), status
+        transcription = task.result()
+    except QueueFull as e:
+        yield session, "", str(e)
+        return
+    except Exception as e:
+        yield session, "", f"Transcription failed: {e}"
+        return
+    finally:
+        task.cancel()
+    yield session, transcription, "Transcription complete!"
 
-def generate_meeting_minutes(transcription):
+async def generate_meeting_minutes(session, transcription):
+    session = session or Session()
     if not transcription:
-        return "Please transcribe the audio first!", ""
-    
-    minutes = generate_minutes(transcription)
+        yield session, "Please transcribe the audio first!", ""
+        return
+
+    # Render tokens as they arrive; the file is written once the stream completes
+    yield session, "", "Generating minutes..."
+    minutes = ""
+    tokens = agenerate_minutes_stream(transcription)
+    try:
+        async for token in tokens:
+            minutes += token
+            yield session, minutes, "Generating minutes..."
+    except Exception as e:
+        yield session, minutes, f"Minutes generation failed: {e}"
+        return
+    finally:
+        # Close the HTTP stream right away when this handler is cancelled
+        await tokens.aclose()
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"minutes_{timestamp}.md"
     
@@ -37,11 +136,36 @@ def generate_meeting_minutes(transcription):
     # Save minutes with full path
     output_path = os.path.join(OUTPUT_DIR, filename)
     save_minutes(minutes, os.path.basename(output_path), OUTPUT_DIR)
-    return minutes, f"Minutes saved to: {output_path}"
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, get_search_index().index_file, output_path)
+    except Exception:
+        logger.exception("Search indexing failed for %s", output_path)
+    yield session, minutes, f"Minutes saved to: {output_path}"
+
+def search_meetings(query, mode, kinds, since, until):
+    if not query.strip():
+        return "Enter a search query.", ""
+    started = time.perf_counter()
+    try:
+        hits = get_search_index().search(query, limit=20, mode=mode, kinds=kinds or None,
+                                         since=since.strip() or None, until=until.strip() or None)
+    except RuntimeError as e:
+        return "", str(e)
+    elapsed = (time.perf_counter() - started) * 1000
+    return format_hits(hits), f"{len(hits)} results in {elapsed:.1f} ms"
+
+def reindex_meetings():
+    result = get_search_index().index_paths([OUTPUT_DIR, RECORDINGS_DIR])
+    return (f"Indexed {result['indexed']} new or changed files of {result['files']}, "
+            f"removed {result['removed']} deleted ones.")
 
 def create_interface():
+    # Imported here rather than at the top, which keeps `import app` within IMPORT_TIME_BUDGET
+    import gradio as gr
+
     with gr.Blocks(title="Meeting Minutes Generator", theme=gr.themes.Base()) as interface:
         gr.Markdown("# 🎙️ Meeting Minutes Generator")
+        session = gr.State(None)
         
         with gr.Tab("1. Record Audio"):
             with gr.Row():
@@ -51,41 +175,98 @@ def create_interface():
             audio_file_output = gr.Textbox(label="Audio File Path", visible=False)
 
         with gr.Tab("2. Transcribe"):
-            transcribe_btn = gr.Button("Transcribe Recording", variant="primary")
-            transcription_output = gr.Textbox(label="Transcription", lines=10)
+            with gr.Row():
+                transcribe_btn = gr.Button("Transcribe Recording", variant="primary")
+                cancel_transcribe_btn = gr.Button("Cancel", variant="stop")
+            transcription_output = gr.Textbox(label="Transcription (speaker timeline when diarization is on)",
+                                              lines=10)
             transcription_status = gr.Textbox(label="Status", interactive=False)
 
         with gr.Tab("3. Generate Minutes"):
-            generate_btn = gr.Button("Generate Minutes", variant="primary")
+            with gr.Row():
+                generate_btn = gr.Button("Generate Minutes", variant="primary")
+                cancel_generate_btn = gr.Button("Cancel", variant="stop")
             minutes_output = gr.Markdown(label="Meeting Minutes")
             minutes_status = gr.Textbox(label="Status", interactive=False)
 
-        # Event handlers
+        with gr.Tab("4. Search"):
+            with gr.Row():
+                search_query = gr.Textbox(label="Search past meetings",
+                                          placeholder="What did we decide about pricing?", scale=4)
+                search_mode = gr.Dropdown(["fulltext", "semantic", "hybrid"], value="fulltext", label="Mode")
+            with gr.Row():
+                search_kinds = gr.CheckboxGroup(list(KINDS), label="Only these parts")
+                search_since = gr.Textbox(label="Since (YYYY-MM-DD)")
+                search_until = gr.Textbox(label="Until (YYYY-MM-DD)")
+            with gr.Row():
+                search_btn = gr.Button("Search", variant="primary")
+                reindex_btn = gr.Button("Re-index files", variant="secondary")
+            search_results = gr.Markdown()
+            search_status = gr.Textbox(label="Status", interactive=False)
+
+        # Event handlers. Gradio's own per-event limit is lifted; the
+        # transcription executor and the LLM semaphore bound the actual work.
         start_btn.click(
             fn=record_audio,
-            outputs=audio_status
+            inputs=session,
+            outputs=[session, audio_status, transcription_output],
+            concurrency_limit=None
         )
         
         stop_btn.click(
             fn=stop_audio_recording,
-            outputs=[audio_file_output, audio_status]
+            inputs=session,
+            outputs=[audio_file_output, audio_status],
+            concurrency_limit=None
         )
         
-        transcribe_btn.click(
+        transcribe_event = transcribe_btn.click(
             fn=process_audio,
-            inputs=audio_file_output,
-            outputs=[transcription_output, transcription_status]
+            inputs=[session, audio_file_output],
+            outputs=[session, transcription_output, transcription_status],
+            concurrency_limit=None
+        )
+
+        cancel_transcribe_btn.click(
+            fn=lambda: "Transcription cancelled.",
+            outputs=transcription_status,
+            cancels=[transcribe_event]
         )
         
-        generate_btn.click(
+        generate_event = generate_btn.click(
             fn=generate_meeting_minutes,
-            inputs=transcription_output,
-            outputs=[minutes_output, minutes_status]
+            inputs=[session, transcription_output],
+            outputs=[session, minutes_output, minutes_status],
+            concurrency_limit=None
+        )
+
+        cancel_generate_btn.click(
+            fn=lambda: "Minutes generation cancelled.",
+            outputs=minutes_status,
+            cancels=[generate_event]
         )
 
+        search_inputs = [search_query, search_mode, search_kinds, search_since, search_until]
+        search_btn.click(fn=search_meetings, inputs=search_inputs, outputs=[search_results, search_status])
+        search_query.submit(fn=search_meetings, inputs=search_inputs, outputs=[search_results, search_status])
+        reindex_btn.click(fn=reindex_meetings, outputs=search_status)
+
     return interface
 
+def warm_up():
+    """Load Whisper and the LLM client off the request path, after the UI is up"""
+    def load():
+        get_client()
+        registry.warm_up()
+
+    thread = threading.Thread(target=load, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
 if __name__ == "__main__":
+    tracing.configure_from_env()
+    if WARM_UP:
+        warm_up()
     interface = create_interface()
     interface.launch(
         server_name="0.0.0.0",
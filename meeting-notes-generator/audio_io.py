@@ -0,0 +1,174 @@
+import time
+import wave
+from math import gcd
+
+import numpy as np
+import tracing
+
+TARGET_RATE = 16000
+BLOCK_FRAMES = 1 << 16
+
+
+def pcm_to_float(raw, sample_width, channels):
+    """Convert little-endian PCM bytes to a (frames, channels) float32 array in [-1, 1)"""
+    if sample_width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8
+        data = ints.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    return data.reshape(-1, channels)
+
+
+def downmix(block):
+    """Average interleaved channels down to mono"""
+    if block.ndim == 1:
+        return block
+    if block.shape[1] == 1:
+        return block[:, 0]
+    return block.mean(axis=1, dtype=np.float32)
+
+
+def iter_wav_blocks(audio_path, block_frames=BLOCK_FRAMES):
+    """Read a WAV file block by block, yielding (rate, mono float32 block).
+
+    Only one block of frames is held in memory at a time, regardless of
+    the length of the recording.
+    """
+    with wave.open(audio_path, 'rb') as wf:
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        while True:
+            raw = wf.readframes(block_frames)
+            if not raw:
+                break
+            yield rate, downmix(pcm_to_float(raw, sample_width, channels))
+
+
+def wav_info(audio_path):
+    with wave.open(audio_path, 'rb') as wf:
+        return {
+            "rate": wf.getframerate(),
+            "channels": wf.getnchannels(),
+            "sample_width": wf.getsampwidth(),
+            "frames": wf.getnframes(),
+        }
+
+
+class PolyphaseResampler:
+    """Streaming rational-ratio resampler.
+
+    Equivalent to upsampling by `up`, low-pass filtering with a windowed
+    sinc and downsampling by `down`, but only the filter phases that land
+    on output samples are evaluated. State between blocks is the last
+    `taps_per_phase - 1` input samples, so memory stays bounded for
+    arbitrarily long streams.
+    """
+
+    def __init__(self, in_rate, out_rate=TARGET_RATE, taps_per_phase=32, beta=8.0):
+        g = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        self.taps = taps_per_phase
+
+        num_taps = self.up * taps_per_phase
+        # Odd-length symmetric filter so the group delay is a whole sample
+        odd_taps = num_taps - 1 + num_taps % 2
+        self._delay = (odd_taps - 1) // 2
+        cutoff = 0.95 / max(self.up, self.down)
+        t = np.arange(odd_taps) - self._delay
+        h = cutoff * np.sinc(cutoff * t) * np.kaiser(odd_taps, beta) * self.up
+        h = np.pad(h, (0, num_taps - odd_taps))
+        # phases[p, i] == h[i * up + p]
+        self._phases = h.reshape(taps_per_phase, self.up).T.astype(np.float32)
+
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._seen = 0
+        self._next_out = 0
+
+    def _last_ready(self, available):
+        # Largest output index whose newest input sample is already available
+        return (available * self.up - 1 - self._delay) // self.down
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if self.up == self.down == 1:
+            self._seen += len(block)
+            return block
+
+        base = self._seen - (self.taps - 1)
+        buf = np.concatenate([self._history, block])
+        self._seen += len(block)
+
+        last = self._last_ready(self._seen)
+        n = np.arange(self._next_out, last + 1)
+        if len(n) == 0:
+            out = np.zeros(0, dtype=np.float32)
+        else:
+            t = n * self.down + self._delay
+            newest = t // self.up - base
+            idx = newest[:, None] - np.arange(self.taps)[None, :]
+            out = np.einsum("ij,ij->i", buf[idx], self._phases[t % self.up])
+            self._next_out = last + 1
+
+        self._history = buf[len(buf) - (self.taps - 1):]
+        return out.astype(np.float32, copy=False)
+
+    def flush(self):
+        """Emit the samples still held back by the filter delay"""
+        if self.up == self.down == 1:
+            return np.zeros(0, dtype=np.float32)
+        total = -(-self._seen * self.up // self.down)
+        remaining = total - self._next_out
+        if remaining <= 0:
+            return np.zeros(0, dtype=np.float32)
+        needed = ((total - 1) * self.down + self._delay) // self.up + 1
+        seen = self._seen
+        out = self.process(np.zeros(max(needed - seen, 0), dtype=np.float32))
+        self._seen = seen
+        return out[:remaining]
+
+
+def resample(audio, in_rate, out_rate=TARGET_RATE):
+    if in_rate == out_rate:
+        return np.asarray(audio, dtype=np.float32)
+    resampler = PolyphaseResampler(in_rate, out_rate)
+    return np.concatenate([resampler.process(audio), resampler.flush()])
+
+
+def iter_audio_blocks(audio_path, target_rate=TARGET_RATE, block_frames=BLOCK_FRAMES):
+    """Stream a WAV file as mono float32 blocks at `target_rate`"""
+    resampler = None
+    blocks = iter_wav_blocks(audio_path, block_frames)
+    while True:
+        started = time.perf_counter()
+        rate, block = next(blocks, (None, None))
+        tracing.add_time("audio.read", time.perf_counter() - started)
+        if block is None:
+            break
+        if resampler is None:
+            resampler = PolyphaseResampler(rate, target_rate)
+        started = time.perf_counter()
+        out = resampler.process(block)
+        tracing.add_time("audio.resample", time.perf_counter() - started)
+        if len(out):
+            yield out
+    if resampler is not None:
+        tail = resampler.flush()
+        if len(tail):
+            yield tail
+
+
+def load_audio(audio_path, target_rate=TARGET_RATE):
+    """Read a whole WAV file as a mono float32 array at `target_rate`"""
+    blocks = list(iter_audio_blocks(audio_path, target_rate))
+    if not blocks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(blocks)
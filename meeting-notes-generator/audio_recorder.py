@@ -1,91 +1,264 @@
-import pyaudio
-import wave
 import threading
 import os
 import time
+import uuid
+from collections import deque
 from datetime import datetime
+import tracing
+from wav_writer import IncrementalWavWriter, RingBuffer
 
-# Global variables
-frames = []
-recording = False
-audio = None
-stream = None
-current_file = None
+# Audio settings
+CHANNELS = 1
+RATE = 16000
+CHUNK = 1024
+SAMPLE_WIDTH = 2
+FLUSH_SECONDS = 10
+# Room for a few flush intervals so a slow disk doesn't drop audio
+BUFFER_SECONDS = 3 * FLUSH_SECONDS
+POLL_SECONDS = 0.05
+# Audio a live subscriber may fall behind by before its oldest blocks are dropped
+SUBSCRIBER_BUFFER_SECONDS = int(os.environ.get("SUBSCRIBER_BUFFER_SECONDS", "120"))
+
+# PortAudio callback status flags
+INPUT_UNDERFLOW = 0x1
+INPUT_OVERFLOW = 0x2
+
+
+class Subscriber:
+    """Bounded hand-off of PCM blocks to one consumer, e.g. a LiveTranscriber.
+
+    put() never blocks the recorder: once more than `max_bytes` are waiting
+    the oldest blocks are dropped and counted in `dropped_bytes`, so a
+    consumer that falls behind real time can't grow memory without bound.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.dropped_bytes = 0
+        self._blocks = deque()
+        self._bytes = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, data):
+        with self._cond:
+            self._blocks.append(data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._blocks) > 1:
+                dropped = self._blocks.popleft()
+                self._bytes -= len(dropped)
+                self.dropped_bytes += len(dropped)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def get(self):
+        """Next block, or None once the recorder has stopped and everything was read"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._blocks or self._closed)
+            if not self._blocks:
+                return None
+            data = self._blocks.popleft()
+            self._bytes -= len(data)
+            return data
+
+
+class PyAudioSource:
+    """Microphone input through PyAudio in callback mode"""
+
+    def __init__(self, rate=RATE, channels=CHANNELS, chunk=CHUNK):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self._audio = None
+        self._stream = None
+
+    def start(self, callback):
+        import pyaudio
+
+        def on_audio(in_data, frame_count, time_info, status_flags):
+            callback(in_data, status_flags)
+            return None, pyaudio.paContinue
+
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16,
+                                        channels=self.channels,
+                                        rate=self.rate,
+                                        input=True,
+                                        frames_per_buffer=self.chunk,
+                                        stream_callback=on_audio)
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._audio:
+            self._audio.terminate()
+            self._audio = None
+
+
+class FakeSource:
+    """Replays PCM blocks through the callback, for running without a sound card.
+
+    `blocks` yields raw int16 bytes or (bytes, status_flags) pairs. With
+    `realtime` set, blocks are paced at the rate they would arrive from a
+    microphone.
+    """
+
+    def __init__(self, blocks, rate=RATE, channels=CHANNELS, realtime=False):
+        self.blocks = blocks
+        self.rate = rate
+        self.channels = channels
+        self.realtime = realtime
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, callback):
+        def run():
+            for block in self.blocks:
+                if self._stop.is_set():
+                    break
+                data, status = block if isinstance(block, tuple) else (block, 0)
+                callback(data, status)
+                if self.realtime:
+                    time.sleep(len(data) / (SAMPLE_WIDTH * self.channels * self.rate))
+            self.finished.set()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+class Recorder:
+    """One recording session: capture callback -> ring buffer -> writer thread.
+
+    The capture callback only copies into a preallocated ring buffer and
+    bumps counters, so it never waits on disk I/O or a lock. A separate
+    writer thread drains the buffer into an IncrementalWavWriter. Each
+    instance owns its own state, so several can record concurrently.
+    """
+
+    def __init__(self, output_dir="recordings", source=None, rate=RATE, channels=CHANNELS,
+                 chunk=CHUNK, flush_seconds=FLUSH_SECONDS, buffer_seconds=BUFFER_SECONDS):
+        self.output_dir = output_dir
+        self.rate = rate
+        self.channels = channels
+        self.source = source or PyAudioSource(rate, channels, chunk)
+        self.flush_seconds = flush_seconds
+        self.frame_bytes = channels * SAMPLE_WIDTH
+        self.buffer = RingBuffer(rate * self.frame_bytes * buffer_seconds)
+
+        self.path = None
+        self.writer = None
+        self.overflows = 0
+        self.underruns = 0
+        self.callbacks = 0
+        self._subscribers = []
+        self._stopped = threading.Event()
+        self._writer_thread = None
+
+    @property
+    def recording(self):
+        return self._writer_thread is not None and not self._stopped.is_set()
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Suffix keeps concurrent recorders started in the same second apart
+        self.path = os.path.join(self.output_dir, f"recording_{timestamp}_{uuid.uuid4().hex[:6]}.wav")
+        self.writer = IncrementalWavWriter(self.path, self.channels, SAMPLE_WIDTH, self.rate)
+
+        self._stopped.clear()
+        self._writer_thread = threading.Thread(target=self._drain_loop, name="recorder-writer", daemon=True)
+        self._writer_thread.start()
+        self.source.start(self._on_audio)
+        return self.path
+
+    def _on_audio(self, data, status):
+        self.callbacks += 1
+        if status & INPUT_OVERFLOW:
+            self.overflows += 1
+        if status & INPUT_UNDERFLOW:
+            self.underruns += 1
+        self.buffer.write(data)
+
+    def subscribe(self, buffer_seconds=SUBSCRIBER_BUFFER_SECONDS):
+        """Return a Subscriber that receives every PCM block written, then None at stop"""
+        subscriber = Subscriber(self.rate * self.frame_bytes * buffer_seconds)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def _drain(self):
+        data = self.buffer.read(align=self.frame_bytes)
+        if data:
+            self.writer.write(data)
+            for subscriber in self._subscribers:
+                subscriber.put(data)
+        return data
+
+    def _drain_loop(self):
+        last_flush = time.monotonic()
+        while not self._stopped.wait(POLL_SECONDS):
+            self._drain()
+            if time.monotonic() - last_flush >= self.flush_seconds:
+                with tracing.span("recorder.flush"):
+                    self.writer.flush()
+                last_flush = time.monotonic()
+
+    def stop(self):
+        if self._writer_thread is None:
+            return self.path
+        self.source.stop()
+        self._stopped.set()
+        self._writer_thread.join()
+        self._writer_thread = None
+
+        # Save any remaining frames
+        self._drain()
+        self.writer.close()
+        for subscriber in self._subscribers:
+            subscriber.close()
+            if subscriber.dropped_bytes:
+                tracing.count("subscriber_dropped_seconds",
+                              subscriber.dropped_bytes / (self.rate * self.frame_bytes))
+
+        stats = self.stats()
+        tracing.count("audio_seconds", stats["seconds_written"], stage="record")
+        tracing.count("recorder_dropped_frames", stats["dropped_frames"])
+        tracing.count("recorder_overflows", stats["overflows"])
+        tracing.count("recorder_underruns", stats["underruns"])
+        return self.path
+
+    def stats(self):
+        return {
+            "callbacks": self.callbacks,
+            "overflows": self.overflows,
+            "underruns": self.underruns,
+            "dropped_frames": self.buffer.dropped_bytes // self.frame_bytes,
+            "frames_written": self.writer.frames if self.writer else 0,
+            "seconds_written": self.writer.duration if self.writer else 0.0,
+        }
+
+
+# Default recorder used by the module-level helpers
+_recorder = None
 
 def start_recording():
-    global recording, audio, stream, frames, current_file
-    
-    frames = []
-    recording = True
-    audio = pyaudio.PyAudio()
-    
-    # Audio settings
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1
-    RATE = 16000
-    CHUNK = 1024
-    
-    # Create initial file
-    os.makedirs("recordings", exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    current_file = f"recordings/recording_{timestamp}.wav"
-    
-    stream = audio.open(format=FORMAT,
-                       channels=CHANNELS,
-                       rate=RATE,
-                       input=True,
-                       frames_per_buffer=CHUNK,
-                       stream_callback=None)
-    
-    # Start recording thread
-    threading.Thread(target=record_audio).start()
-
-def save_chunks(frames_to_save):
-    global current_file
-    
-    with wave.open(current_file, 'wb') as wf:
-        if wf.tell() == 0:  # New file, write headers
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(16000)
-        wf.writeframes(b''.join(frames_to_save))
-
-def record_audio():
-    global recording, stream, frames
-    
-    last_save = time.time()
-    temp_frames = []
-    
-    while recording:
-        try:
-            data = stream.read(1024, exception_on_overflow=False)
-            temp_frames.append(data)
-            frames.append(data)
-            
-            current_time = time.time()
-            if current_time - last_save >= 10:
-                save_chunks(temp_frames)
-                temp_frames = []
-                last_save = current_time
-        except OSError as e:
-            print(f"Warning: {e}")
-            time.sleep(0.1)  # Add small delay to help prevent overflow
-            continue
+    global _recorder
+    _recorder = Recorder()
+    _recorder.start()
 
 def stop_recording():
-    global recording, audio, stream, frames, current_file
-    
-    recording = False
-    
-    if stream:
-        stream.stop_stream()
-        stream.close()
-    
-    if audio:
-        audio.terminate()
-    
-    # Save any remaining frames
-    if frames:
-        save_chunks(frames)
-    
-    return current_file
+    if _recorder is None:
+        return None
+    return _recorder.stop()
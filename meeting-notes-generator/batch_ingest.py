@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict
+
+import tracing
+from transcript_cache import audio_fingerprint
+
+
+def find_recordings(source):
+    """List WAV files in a directory tree, or the paths listed in a manifest file"""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".wav"))
+        return sorted(paths)
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r') as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [line if os.path.isabs(line) else os.path.join(base, line) for line in lines]
+
+
+def session_id_for(fingerprint):
+    return f"batch-{fingerprint[:32]}"
+
+
+def is_completed(storage, session_id):
+    session = storage.read(session_id)
+    if session is None or not session.session_data:
+        return False
+    return bool(session.session_data.get("session_state", {}).get("minutes"))
+
+
+def _init_worker(threads_per_worker):
+    import torch
+    from model_registry import registry
+
+    # Split cores between workers instead of letting every worker use all of them
+    torch.set_num_threads(threads_per_worker)
+    # Workers append spans to the shared JSONL file; only the parent serves /metrics
+    if os.environ.get("TRACING_JSONL"):
+        tracing.configure(True, [tracing.JsonLinesExporter(os.environ["TRACING_JSONL"])])
+    registry.warm_up()
+
+
+def _transcribe(path):
+    from diarization import DIARIZATION_ENABLED, diarize
+    from transcribe_audio import transcribe_segments
+
+    started = time.perf_counter()
+    stats = {}
+    text, segments = transcribe_segments(path, stats=stats)
+    # Diarize in the worker process too; it is CPU work on the same audio
+    turns = None
+    if DIARIZATION_ENABLED:
+        try:
+            turns = diarize(path, segments)
+        except Exception as e:
+            print(f"[warning] {path}: diarization failed, using the flat transcript: {e}")
+    return {
+        "text": text,
+        "segments": [asdict(segment) for segment in segments],
+        "turns": [asdict(turn) for turn in turns] if turns else None,
+        "transcribe_seconds": time.perf_counter() - started,
+        "audio_seconds": stats.get("audio_seconds"),
+    }
+
+
+def _summarize(path, session_id, transcription, storage, use_llm_cache=True):
+    from diarization import Turn
+    from long_form import Segment
+    from meeting_workflow import MeetingNotesWorkflow, save_minutes_to_markdown
+    from search_index import get_search_index
+
+    started = time.perf_counter()
+    workflow = MeetingNotesWorkflow(storage=storage, session_id=session_id)
+    workflow.use_llm_cache = use_llm_cache
+    segments = [Segment(**segment) for segment in transcription["segments"]]
+    turns = [Turn(**turn) for turn in transcription["turns"]] if transcription["turns"] else None
+    minutes = workflow.generate_minutes(transcription["text"], segments, turns)
+
+    output_path = os.path.splitext(path)[0] + "_minutes.md"
+    save_minutes_to_markdown(minutes.model_dump(), output_path)
+    workflow.session_state["minutes"] = minutes.model_dump()
+    workflow.session_state["audio_path"] = path
+    workflow.write_to_storage()
+    get_search_index().index_minutes(session_id, minutes, segments, source=path)
+    return {"minutes_path": output_path, "minutes_seconds": time.perf_counter() - started}
+
+
+def run_batch(paths, storage, workers=None, llm_workers=4, report_path=None, use_llm_cache=True):
+    """Transcribe and summarize `paths`, returning a per-file status/timing report.
+
+    Transcription runs in a process pool with one Whisper model per worker,
+    and each finished transcript goes straight to a thread pool for minutes
+    generation, so LLM calls overlap with the remaining transcription.
+    Recordings whose minutes are already in `storage` are skipped, so an
+    interrupted run can simply be restarted.
+    """
+    workers = workers or os.cpu_count() or 1
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    report = {path: {"path": path, "status": "pending"} for path in paths}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(threads_per_worker,)) as transcribers, \
+            ThreadPoolExecutor(max_workers=llm_workers) as summarizers:
+        in_flight = {}
+        for path in paths:
+            entry = report[path]
+            try:
+                session_id = session_id_for(audio_fingerprint(path))
+            except Exception as e:
+                entry.update(status="failed", error=f"unreadable: {e}")
+                continue
+            entry["session_id"] = session_id
+            if is_completed(storage, session_id):
+                entry["status"] = "skipped"
+                continue
+            in_flight[transcribers.submit(_transcribe, path)] = ("transcribe", path)
+
+        # Hand each transcript to the LLM pool as soon as it's ready
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, path = in_flight.pop(future)
+                entry = report[path]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    entry.update(status="failed", stage=stage, error=str(e))
+                    print(f"[failed] {path} ({stage}): {e}")
+                    continue
+
+                if stage == "transcribe":
+                    entry.update(
+                        transcribe_seconds=result["transcribe_seconds"],
+                        audio_seconds=result["audio_seconds"],
+                    )
+                    summary = summarizers.submit(_summarize, path, entry["session_id"], result, storage,
+                                                 use_llm_cache)
+                    in_flight[summary] = ("summarize", path)
+                else:
+                    entry.update(status="done", **result)
+                    print(f"[done] {path} -> {result['minutes_path']}")
+
+    summary = {
+        "total_seconds": time.perf_counter() - started,
+        "counts": {
+            status: sum(1 for entry in report.values() if entry["status"] == status)
+            for status in ("done", "skipped", "failed")
+        },
+        "files": list(report.values()),
+    }
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-generate meeting minutes for many recordings")
+    parser.add_argument("source", help="Directory of WAV files, or a manifest with one path per line")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Transcription processes (default: one per core)")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Concurrent minutes generations")
+    parser.add_argument("--db", default=None, help="SQLite storage file (default: meeting_notes.db)")
+    parser.add_argument("--report", default="batch_report.json", help="Where to write the status/timing report")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM, ignoring cached responses")
+    args = parser.parse_args()
+    tracing.configure_from_env()
+
+    from agno.storage.sqlite import SqliteStorage
+    from meeting_workflow import DB_FILE, TABLE_NAME
+
+    storage = SqliteStorage(table_name=TABLE_NAME, db_file=args.db or DB_FILE)
+    paths = find_recordings(args.source)
+    print(f"Found {len(paths)} recordings")
+
+    summary = run_batch(paths, storage, args.workers, args.llm_workers, args.report, not args.no_llm_cache)
+    counts = summary["counts"]
+    print(f"Done: {counts['done']}, skipped: {counts['skipped']}, failed: {counts['failed']} "
+          f"in {summary['total_seconds']:.1f}s. Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
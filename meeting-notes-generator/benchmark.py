@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+LENGTHS_MINUTES = (1, 10, 60)
+SAMPLE_RATES = (16000, 44100, 48000)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+STUB_MINUTES = "# Meeting Minutes\n\n## Key Discussion Points\n- Benchmark stub\n"
+
+
+def synthesize_wav(path, seconds, rate, seed=0):
+    """Write a speech-like fixture: voiced harmonics in syllable bursts with pauses and noise"""
+    rng = np.random.default_rng(seed)
+    block = rate * 10
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        for start in range(0, int(seconds * rate), block):
+            n = min(block, int(seconds * rate) - start)
+            t = (start + np.arange(n)) / rate
+            pitch = 120 + 30 * np.sin(2 * np.pi * 0.3 * t)
+            voiced = sum(np.sin(2 * np.pi * k * pitch * t) / k for k in range(1, 6))
+            syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+            talking = (np.sin(2 * np.pi * t / 7) > -0.3).astype(np.float32)
+            signal = 0.2 * voiced * syllables * talking + 0.002 * rng.standard_normal(n)
+            wf.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions endpoint"""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.prompt_chars += sum(len(m["content"]) for m in request["messages"])
+        time.sleep(self.server.latency)
+        body = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": STUB_MINUTES}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(latency=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.latency = latency
+    server.prompt_chars = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def time(self, stage, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.add(stage, time.perf_counter() - started)
+        return result
+
+
+def _consume(blocks):
+    samples = 0
+    for block in blocks:
+        samples += len(block)
+    return samples
+
+
+def _time_whisper_stages(timer, audio_path, batch_size):
+    """Feature extraction, generate and decode timed separately over the real windows"""
+    import torch
+    from audio_io import iter_audio_blocks
+    from long_form import iter_windows
+    from model_registry import get_whisper
+
+    processor, model = timer.time("model_load", get_whisper)
+    dtype = getattr(model, "dtype", torch.float32)
+    windows = [chunk for _, chunk in iter_windows(iter_audio_blocks(audio_path))]
+    generated_tokens = 0
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        features = timer.time(
+            "feature_extraction", lambda: processor(batch, sampling_rate=16000, return_tensors="pt")
+        ).input_features.to(model.device, dtype)
+        with torch.inference_mode():
+            ids = timer.time("generate", model.generate, features, return_timestamps=True)
+        generated_tokens += int(ids.numel())
+        timer.time("decode", processor.batch_decode, ids, skip_special_tokens=True)
+    return len(windows), generated_tokens
+
+
+def run_case(audio_path, minutes, rate, batch_size, stub_url, whisper=True, workflow=False):
+    """Run every stage for one fixture; executed in a fresh process so peak RSS is per case"""
+    import mom_generator
+    from audio_io import PolyphaseResampler, iter_wav_blocks
+    from transcribe_audio import transcribe_audio
+
+    audio_seconds = minutes * 60
+    timer = Timer()
+    result = {"minutes": minutes, "rate": rate, "audio_seconds": audio_seconds}
+
+    timer.time("wav_load", _consume, (block for _, block in iter_wav_blocks(audio_path)))
+    resampler = PolyphaseResampler(rate)
+    for _, block in iter_wav_blocks(audio_path):
+        timer.time("resample", resampler.process, block)
+    timer.time("resample", resampler.flush)
+
+    transcript = "benchmark transcript " * (audio_seconds * 2)
+    if whisper:
+        result["windows"], result["generated_tokens"] = _time_whisper_stages(timer, audio_path, batch_size)
+        transcript = timer.time("transcribe_audio_total", transcribe_audio, audio_path, use_cache=False)
+        if workflow:
+            from meeting_workflow import MeetingNotesWorkflow
+            timer.time("workflow_transcribe_total", MeetingNotesWorkflow().transcribe_with_segments, audio_path,
+                       use_cache=False)
+
+    mom_generator.OLLAMA_BASE_URL = stub_url
+    mom_generator._client = None
+    # A cache hit would time a SQLite read instead of the LLM round trip
+    minutes_text = timer.time("llm_call", mom_generator.generate_minutes, transcript, use_cache=False)
+    with tempfile.TemporaryDirectory() as out_dir:
+        timer.time("markdown_write", mom_generator.save_minutes, minutes_text, "minutes.md", out_dir)
+
+    result["stages"] = timer.stages
+    result["rtf"] = {stage: seconds / audio_seconds for stage, seconds in timer.stages.items()}
+    pipeline = sum(s for k, s in timer.stages.items() if not k.endswith("_total") and k != "model_load")
+    result["pipeline_seconds"] = pipeline
+    result["pipeline_rtf"] = pipeline / audio_seconds
+    result["throughput_audio_seconds_per_second"] = audio_seconds / pipeline if pipeline else None
+    if result.get("generated_tokens"):
+        result["generate_tokens_per_second"] = result["generated_tokens"] / timer.stages["generate"]
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(previous, current):
+    """Print the pipeline RTF and peak RSS change per case between two result files"""
+    old = {(c["minutes"], c["rate"]): c for c in previous["cases"]}
+    for case in current["cases"]:
+        before = old.get((case["minutes"], case["rate"]))
+        if before is None:
+            continue
+        rtf_change = (case["pipeline_rtf"] / before["pipeline_rtf"] - 1) * 100
+        rss_change = case["peak_rss_mb"] - before["peak_rss_mb"]
+        print(f"{case['minutes']:>3} min @ {case['rate']:>5} Hz: "
+              f"RTF {before['pipeline_rtf']:.4f} -> {case['pipeline_rtf']:.4f} ({rtf_change:+.1f}%), "
+              f"peak RSS {rss_change:+.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real-time-factor benchmark for the meeting-notes pipeline")
+    parser.add_argument("--lengths", type=int, nargs="+", default=LENGTHS_MINUTES, help="Fixture lengths in minutes")
+    parser.add_argument("--rates", type=int, nargs="+", default=SAMPLE_RATES, help="Fixture sample rates")
+    parser.add_argument("--audio", help="Benchmark this WAV file instead of synthesized fixtures")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--no-whisper", action="store_true", help="Skip model stages (I/O, resample, LLM only)")
+    parser.add_argument("--workflow", action="store_true", help="Also time MeetingNotesWorkflow transcription")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the stub LLM waits per call")
+    parser.add_argument("--output", help="Result JSON path (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="Previous result JSON to compare against")
+    args = parser.parse_args()
+
+    server, stub_url = start_stub_server(args.llm_latency)
+    commit = git_commit()
+    results = {"commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "python": platform.python_version(), "machine": platform.machine(),
+               "cpus": os.cpu_count(), "cases": []}
+
+    with tempfile.TemporaryDirectory() as fixtures:
+        # Cases run in fresh processes that read this at import; keep the real cache untouched
+        os.environ["LLM_CACHE_DB"] = os.path.join(fixtures, "llm_responses.db")
+        os.environ["TRANSCRIPT_CACHE_DIR"] = os.path.join(fixtures, "transcripts")
+        if args.audio:
+            with wave.open(args.audio, 'rb') as wf:
+                cases = [(args.audio, wf.getnframes() / wf.getframerate() / 60, wf.getframerate())]
+        else:
+            cases = []
+            for minutes in args.lengths:
+                for rate in args.rates:
+                    path = os.path.join(fixtures, f"fixture_{minutes}min_{rate}.wav")
+                    synthesize_wav(path, minutes * 60, rate)
+                    cases.append((path, minutes, rate))
+
+        for path, minutes, rate in cases:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                case = pool.submit(run_case, path, minutes, rate, args.batch_size, stub_url,
+                                   not args.no_whisper, args.workflow).result()
+            results["cases"].append(case)
+            print(f"{minutes:>3} min @ {rate:>5} Hz: pipeline RTF {case['pipeline_rtf']:.4f}, "
+                  f"peak RSS {case['peak_rss_mb']:.0f} MB, "
+                  + ", ".join(f"{k} {v:.2f}s" for k, v in case["stages"].items()))
+    server.shutdown()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
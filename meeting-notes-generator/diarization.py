@@ -0,0 +1,314 @@
+import os
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+import tracing
+from audio_io import TARGET_RATE, iter_audio_blocks
+from summarize import format_timestamp
+
+# Opt-in: the timeline drops fillers and stutters, so it replaces the flat transcript only when asked for
+DIARIZATION_ENABLED = os.environ.get("DIARIZATION", "0") == "1"
+MAX_SPEAKERS = int(os.environ.get("DIARIZATION_MAX_SPEAKERS", "8"))
+# RMS distance between clusters' mean MFCCs below which they are treated as the same voice
+MERGE_DISTANCE = float(os.environ.get("DIARIZATION_MERGE_DISTANCE", "1.0"))
+
+# 25 ms frames every 10 ms; speaker embeddings are MFCC statistics over 1.5 s windows
+FRAME_LENGTH = 400
+FRAME_HOP = 160
+NFFT = 512
+N_MELS = 40
+N_MFCC = 20
+WINDOW_FRAMES = 150
+WINDOW_HOP_FRAMES = 75
+# Windows whose mean log energy is this far above the quietest 10% of frames count as speech (~6.5 dB)
+SPEECH_MARGIN = 1.5
+# Clusters covering less than this share of the speech are folded into their nearest neighbour
+MIN_SPEAKER_SHARE = 0.02
+# Majority vote over this many neighbouring windows to remove one-window speaker flips
+SMOOTHING_WINDOWS = 5
+
+FILLERS = re.compile(r"\b(?:um+|uh+|erm+|hmm+|mm+|ah+)\b[,.]?\s*", re.IGNORECASE)
+# Three or more of the same word in a row; a doubled word ("had had", "that that") is often real
+REPEATS = re.compile(r"\b(\w+)(?:\s+\1\b){2,}", re.IGNORECASE)
+
+
+@dataclass
+class Turn:
+    speaker: str
+    start: float
+    end: float
+    text: str = ""
+
+
+def mel_filterbank(n_mels=N_MELS, nfft=NFFT, rate=TARGET_RATE, fmin=20.0, fmax=None):
+    """Triangular mel filters as an (n_mels, nfft // 2 + 1) matrix"""
+    fmax = fmax or rate / 2
+    to_mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    to_hz = lambda mel: 700 * (10 ** (mel / 2595) - 1)
+    edges = to_hz(np.linspace(to_mel(fmin), to_mel(fmax), n_mels + 2))
+    bins = np.fft.rfftfreq(nfft, 1 / rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def dct_matrix(n_out=N_MFCC, n_in=N_MELS):
+    """Orthonormal DCT-II basis, (n_out, n_in)"""
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2 / n_in)
+    basis[0] /= np.sqrt(2)
+    return basis.astype(np.float32)
+
+
+class MFCCExtractor:
+    """Streaming MFCCs: feed 16 kHz blocks, get (frames, N_MFCC) features and per-frame log energy"""
+
+    def __init__(self, rate=TARGET_RATE):
+        self.filters = mel_filterbank(rate=rate)
+        self.dct = dct_matrix()
+        self.window = np.hamming(FRAME_LENGTH).astype(np.float32)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._last = 0.0
+
+    def process(self, block):
+        # Pre-emphasis carries the previous block's last sample across the boundary
+        block = np.asarray(block, dtype=np.float32)
+        emphasized = block - 0.97 * np.concatenate(([self._last], block[:-1]))
+        if len(block):
+            self._last = block[-1]
+        samples = np.concatenate((self._pending, emphasized))
+        if len(samples) < FRAME_LENGTH:
+            self._pending = samples
+            return np.zeros((0, N_MFCC), np.float32), np.zeros(0, np.float32)
+        n_frames = 1 + (len(samples) - FRAME_LENGTH) // FRAME_HOP
+        frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_LENGTH)[::FRAME_HOP][:n_frames]
+        self._pending = samples[n_frames * FRAME_HOP:]
+
+        power = np.abs(np.fft.rfft(frames * self.window, NFFT)) ** 2
+        mel = np.log(power @ self.filters.T + 1e-10)
+        energy = np.log(power.sum(axis=1) + 1e-10).astype(np.float32)
+        return (mel @ self.dct.T).astype(np.float32), energy
+
+
+def window_embeddings(mfcc, energy):
+    """Mean/std MFCC statistics per 1.5 s window, plus window start times and a speech mask"""
+    if len(mfcc) < WINDOW_FRAMES:
+        return np.zeros((0, 2 * (N_MFCC - 1))), np.zeros(0), np.zeros(0, bool)
+    # c0 tracks loudness rather than voice, so it is left out of the embedding
+    features = mfcc[:, 1:].astype(np.float64)
+    starts = np.arange(0, len(features) - WINDOW_FRAMES + 1, WINDOW_HOP_FRAMES)
+    sums = np.concatenate((np.zeros((1, features.shape[1])), np.cumsum(features, axis=0)))
+    squares = np.concatenate((np.zeros((1, features.shape[1])), np.cumsum(features ** 2, axis=0)))
+    mean = (sums[starts + WINDOW_FRAMES] - sums[starts]) / WINDOW_FRAMES
+    var = (squares[starts + WINDOW_FRAMES] - squares[starts]) / WINDOW_FRAMES - mean ** 2
+    embeddings = np.hstack((mean, np.sqrt(np.maximum(var, 0))))
+
+    energy_sums = np.concatenate(([0.0], np.cumsum(energy, dtype=np.float64)))
+    window_energy = (energy_sums[starts + WINDOW_FRAMES] - energy_sums[starts]) / WINDOW_FRAMES
+    speech = window_energy > np.percentile(energy, 10) + SPEECH_MARGIN
+    if not speech.any():
+        speech[:] = True
+    return embeddings, starts * FRAME_HOP / TARGET_RATE, speech
+
+
+def _normalize_rows(x):
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-10)
+
+
+def cluster_speakers(embeddings, max_speakers=MAX_SPEAKERS, merge_distance=MERGE_DISTANCE,
+                     min_share=MIN_SPEAKER_SHARE, iterations=20, seed=0):
+    """Label each embedding with a speaker index.
+
+    Spherical k-means on standardized embeddings with `max_speakers`
+    clusters over-segments on purpose. Clusters are then merged closest
+    first while their mean MFCCs are less than `merge_distance` apart, and
+    clusters holding less than `min_share` of the windows are folded into
+    their nearest neighbour, so the number of speakers is found from the
+    data. Merging uses unstandardized MFCCs so that one voice isn't split
+    just because standardization stretched its natural variation. Every
+    step is an (n, k) matrix operation.
+    """
+    n = len(embeddings)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    x = embeddings - embeddings.mean(axis=0)
+    x = _normalize_rows(x / np.maximum(x.std(axis=0), 1e-10))
+    k = min(max_speakers, n)
+
+    # k-means++ seeding on cosine distance
+    rng = np.random.default_rng(seed)
+    centroids = [x[rng.integers(n)]]
+    for _ in range(1, k):
+        distance = np.clip(1 - np.max(x @ np.array(centroids).T, axis=1), 0, None)
+        if distance.sum() == 0:
+            break
+        centroids.append(x[rng.choice(n, p=distance / distance.sum())])
+    centroids = np.array(centroids)
+
+    for _ in range(iterations):
+        labels = np.argmax(x @ centroids.T, axis=1)
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        keep = counts > 0
+        updated = _normalize_rows(sums[keep])
+        if updated.shape == centroids.shape and np.allclose(updated, centroids):
+            break
+        centroids = updated
+    labels = np.unique(np.argmax(x @ centroids.T, axis=1), return_inverse=True)[1]
+    counts = np.bincount(labels).astype(float)
+    # Mean MFCCs (the first half of each embedding) per cluster
+    raw = embeddings[:, :embeddings.shape[1] // 2]
+    sums = np.zeros((len(counts), raw.shape[1]))
+    np.add.at(sums, labels, raw)
+
+    while len(counts) > 1:
+        means = sums / counts[:, None]
+        distance = np.sqrt(((means[:, None] - means[None]) ** 2).mean(axis=2))
+        np.fill_diagonal(distance, np.inf)
+        smallest = np.argmin(counts)
+        if counts[smallest] < min_share * n:
+            a, b = int(np.argmin(distance[smallest])), smallest
+        else:
+            a, b = np.unravel_index(np.argmin(distance), distance.shape)
+            if distance[a, b] >= merge_distance:
+                break
+        a, b = min(a, b), max(a, b)
+        sums[a] += sums[b]
+        counts[a] += counts[b]
+        labels[labels == b] = a
+        labels[labels > b] -= 1
+        sums, counts = np.delete(sums, b, axis=0), np.delete(counts, b)
+    return labels
+
+
+def smooth_labels(labels, width=SMOOTHING_WINDOWS):
+    """Majority vote over a sliding window of neighbouring labels"""
+    if len(labels) == 0 or width <= 1:
+        return labels
+    onehot = np.eye(labels.max() + 1)[labels]
+    pad = width // 2
+    padded = np.pad(onehot, ((pad, pad), (0, 0)), mode="edge")
+    sums = np.cumsum(np.vstack((np.zeros((1, onehot.shape[1])), padded)), axis=0)
+    votes = sums[width:] - sums[:-width]
+    return np.argmax(votes, axis=1)
+
+
+def labels_to_turns(labels, starts, window_seconds=WINDOW_FRAMES * FRAME_HOP / TARGET_RATE):
+    """Collapse per-window labels into turns that tile the timeline"""
+    if len(labels) == 0:
+        return []
+    turns = []
+    change = np.flatnonzero(np.diff(labels)) + 1
+    for run_start, run_end in zip(np.r_[0, change], np.r_[change, len(labels)]):
+        speaker = int(labels[run_start])
+        start, end = float(starts[run_start]), float(starts[run_end - 1] + window_seconds)
+        if turns:
+            # Windows overlap, so split the overlap between neighbouring turns
+            boundary = (turns[-1].end + start) / 2
+            turns[-1].end = boundary
+            start = boundary
+        turns.append(Turn(speaker, start, end))
+    return turns
+
+
+def compact_text(text):
+    """Drop filler words and stuttered repeats; they cost tokens and carry no content"""
+    text = FILLERS.sub("", text)
+    text = REPEATS.sub(r"\1", text)
+    return " ".join(text.split())
+
+
+def timed_words(segment):
+    """(time, word) pairs, each word placed within its phrase's Whisper timestamps.
+
+    Segments without phrase timestamps (older cached transcripts) spread
+    their words evenly over the whole segment.
+    """
+    for start, end, text in segment.chunks or [(segment.start, segment.end, segment.text)]:
+        words = text.split()
+        for i, word in enumerate(words):
+            yield start + (i + 0.5) / len(words) * (end - start), word
+
+
+def assign_text(turns, segments):
+    """Hand each word to the turn it was spoken in, going by Whisper's phrase timestamps.
+
+    Turns left without words are dropped and speakers are named S1, S2, ...
+    in order of first appearance.
+    """
+    if not turns:
+        return [Turn("S1", s.start, s.end, compact_text(s.text)) for s in segments if s.text]
+    boundaries = np.array([turn.start for turn in turns])
+    words_by_turn = [[] for _ in turns]
+    for segment in segments:
+        timed = list(timed_words(segment))
+        if not timed:
+            continue
+        times, words = np.array([time for time, _ in timed]), [word for _, word in timed]
+        owners = np.clip(np.searchsorted(boundaries, times, side="right") - 1, 0, len(turns) - 1)
+        for owner, word in zip(owners, words):
+            words_by_turn[owner].append(word)
+
+    names = {}
+    merged = []
+    for turn, words in zip(turns, words_by_turn):
+        text = compact_text(" ".join(words))
+        if not text:
+            continue
+        speaker = names.setdefault(turn.speaker, f"S{len(names) + 1}")
+        if merged and merged[-1].speaker == speaker:
+            merged[-1].end = turn.end
+            merged[-1].text += " " + text
+        else:
+            merged.append(Turn(speaker, turn.start, turn.end, text))
+    return merged
+
+
+def diarize(audio_path, segments, max_speakers=MAX_SPEAKERS, merge_distance=MERGE_DISTANCE):
+    """Label transcript segments with speakers, returning a list of Turns.
+
+    Runs on CPU in one streaming pass over the recording; segment times
+    must be on the original recording's timeline (as transcribe_segments
+    returns them, VAD or not).
+    """
+    with tracing.span("diarize", audio=os.path.basename(audio_path)) as span:
+        extractor = MFCCExtractor()
+        mfccs, energies = [], []
+        for block in iter_audio_blocks(audio_path):
+            mfcc, energy = extractor.process(block)
+            mfccs.append(mfcc)
+            energies.append(energy)
+        mfcc = np.concatenate(mfccs) if mfccs else np.zeros((0, N_MFCC), np.float32)
+        energy = np.concatenate(energies) if energies else np.zeros(0, np.float32)
+
+        embeddings, starts, speech = window_embeddings(mfcc, energy)
+        labels = np.full(len(starts), -1)
+        labels[speech] = cluster_speakers(embeddings[speech], max_speakers, merge_distance)
+        # Silent windows inherit the previous speaker so pauses don't split a turn
+        voiced = np.flatnonzero(labels >= 0)
+        if len(voiced):
+            fill = np.maximum.accumulate(np.where(labels >= 0, np.arange(len(labels)), -1))
+            labels = np.where(fill >= 0, labels[np.maximum(fill, 0)], labels[voiced[0]])
+            labels = smooth_labels(labels)
+        else:
+            labels = np.zeros(len(starts), dtype=int)
+
+        turns = assign_text(labels_to_turns(labels, starts), segments)
+        span.set(speakers=len({turn.speaker for turn in turns}), turns=len(turns))
+    return turns
+
+
+def render_timeline(turns):
+    """One line per speaker turn: '[mm:ss] S1: text'"""
+    return "\n".join(f"[{format_timestamp(turn.start)}] {turn.speaker}: {turn.text}" for turn in turns)
+
+
+def turn_segments(turns):
+    """Turns as speaker-prefixed Segment-like lines, for chunk_segments on long meetings"""
+    from long_form import Segment
+    return [Segment(turn.start, turn.end, f"{turn.speaker}: {turn.text}") for turn in turns]
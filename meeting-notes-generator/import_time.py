@@ -0,0 +1,48 @@
+import os
+import re
+import subprocess
+import sys
+
+# Seconds `import app` may take in a fresh interpreter; gradio and the models load later
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", "0.8"))
+# Heavy packages that are only imported once the UI is built or a model or client is first used
+DEFERRED = ("gradio", "torch", "transformers", "openai", "agno.agent", "sentence_transformers", "optimum")
+# "import time:      self [us] |    cumulative | imported package"
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module="app"):
+    """Import `module` under `python -X importtime`; returns [(package, cumulative_s, depth)] for its import tree"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = [(package, int(cumulative) / 1e6, len(indent) // 2)
+            for _, cumulative, indent, package in LINE.findall(result.stderr)]
+    # Children are printed before their parent; the tree starts after the previous top-level import
+    end = max(i for i, (package, _, depth) in enumerate(rows) if package == module and depth == 0)
+    start = end
+    while start > 0 and rows[start - 1][2] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def check(module="app", budget=IMPORT_TIME_BUDGET, top=10):
+    """Print the slowest direct imports; True when within budget and nothing deferred was imported"""
+    rows = measure(module)
+    total = rows[-1][1]
+    imported = {package for package, _, _ in rows}
+    eager = [name for name in DEFERRED if name in imported]
+    print(f"import {module}: {total:.2f}s (budget {budget:.2f}s)")
+    for package, seconds, _ in sorted((r for r in rows if r[2] == 1), key=lambda r: -r[1])[:top]:
+        print(f"  {seconds:8.3f}s  {package}")
+    if eager:
+        print(f"Imported at startup but should be deferred: {', '.join(eager)}")
+    return total <= budget and not eager
+
+
+if __name__ == "__main__":
+    module = sys.argv[1] if len(sys.argv) > 1 else "app"
+    sys.exit(0 if check(module) else 1)
@@ -0,0 +1,199 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+import tracing
+
+# Concurrent jobs per stage. Only CPU/GPU-bound transcription is queued here;
+# LLM calls are async and bounded by mom_generator's LLM_CONCURRENCY semaphore.
+STAGE_CONCURRENCY = {
+    "transcribe": int(os.environ.get("TRANSCRIBE_CONCURRENCY", "1")),
+}
+MAX_PENDING = int(os.environ.get("JOB_QUEUE_MAX_PENDING", "32"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """A unit of work submitted to a JobQueue stage.
+
+    The job's function receives the Job itself, so it can report progress
+    and partial output with `report` and stop early when cancelled
+    (`report` raises JobCancelled once `cancel` has been called).
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, stage, fn, args, kwargs):
+        self.id = next(self._ids)
+        self.stage = stage
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.position = None
+        self.submitted_at = time.monotonic()
+        self._queue = None
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # A job still waiting in line is dropped now, so it stops counting toward max_pending
+        if self._queue is not None and self._queue._discard(self):
+            self._finish(CANCELLED)
+
+    def report(self, progress=None, message=None, partial=None):
+        if self.cancelled:
+            raise JobCancelled()
+        if progress is not None:
+            self.progress = progress
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def add_done_callback(self, fn):
+        """Call fn(job) from the worker thread once the job finishes (right away if it already has)"""
+        with self._callbacks_lock:
+            if not self.finished:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.position = None
+        with self._callbacks_lock:
+            self._finished.set()
+            callbacks, self._callbacks = self._callbacks, []
+        tracing.count("jobs", stage=self.stage, status=status)
+        for fn in callbacks:
+            fn(self)
+
+
+class JobQueue:
+    """Bounded FIFO queues with a fixed pool of worker threads per stage"""
+
+    def __init__(self, concurrency=None, max_pending=MAX_PENDING):
+        self.concurrency = dict(concurrency or STAGE_CONCURRENCY)
+        self.max_pending = max_pending
+        self._pending = {stage: deque() for stage in self.concurrency}
+        # Queued jobs and direct users of a stage (live transcription) share its slots
+        self._slots = {stage: threading.BoundedSemaphore(count) for stage, count in self.concurrency.items()}
+        self._cond = threading.Condition()
+        self._workers = []
+        for stage, count in self.concurrency.items():
+            for i in range(count):
+                worker = threading.Thread(target=self._work, args=(stage,),
+                                          name=f"{stage}-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, stage, fn, *args, **kwargs):
+        job = Job(stage, fn, args, kwargs)
+        job._queue = self
+        with self._cond:
+            pending = self._pending[stage]
+            if len(pending) >= self.max_pending:
+                raise QueueFull(f"Too many {stage} jobs waiting; try again shortly")
+            pending.append(job)
+            self._update_positions(stage)
+            self._cond.notify_all()
+        return job
+
+    def _discard(self, job):
+        """Remove a job that no worker has picked up yet; False if it already left the queue"""
+        with self._cond:
+            try:
+                self._pending[job.stage].remove(job)
+            except ValueError:
+                return False
+            self._update_positions(job.stage)
+        return True
+
+    def _update_positions(self, stage):
+        for position, job in enumerate(self._pending[stage], 1):
+            job.position = position
+
+    def _work(self, stage):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending[stage])
+                job = self._pending[stage].popleft()
+                self._update_positions(stage)
+            job.position = None
+
+            with self._slots[stage]:
+                if job.cancelled:
+                    job._finish(CANCELLED)
+                    continue
+                job.status = RUNNING
+                tracing.add_time(f"queue_wait.{stage}", time.monotonic() - job.submitted_at)
+                try:
+                    with tracing.span(f"job.{stage}", job_id=job.id):
+                        result = job.fn(job, *job.args, **job.kwargs)
+                except JobCancelled:
+                    job._finish(CANCELLED)
+                except Exception as e:
+                    job._finish(FAILED, error=e)
+                else:
+                    job._finish(DONE, result=result)
+
+    def slot(self, stage):
+        """Context manager holding one of the stage's concurrency slots, for work that can't be a queued job"""
+        return self._slots[stage]
+
+    def watch(self, job, poll_seconds=0.25):
+        """Yield the job after every poll until it finishes"""
+        while not job.wait(poll_seconds):
+            yield job
+        yield job
+
+    def pending(self, stage):
+        with self._cond:
+            return len(self._pending[stage])
+
+
+job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    global job_queue
+    with _job_queue_lock:
+        if job_queue is None:
+            job_queue = JobQueue()
+    return job_queue
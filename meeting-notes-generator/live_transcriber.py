@@ -0,0 +1,121 @@
+import os
+import threading
+
+from audio_io import PolyphaseResampler, TARGET_RATE, downmix, pcm_to_float
+from audio_recorder import SAMPLE_WIDTH
+from job_queue import get_job_queue
+from long_form import iter_decoded_windows, iter_merged_windows, iter_windows, join_segments
+from model_registry import DEFAULT_MODEL, get_whisper
+from transcribe_audio import store_transcript, transcript_key
+from vad import VAD_ENABLED, VoiceActivityDetector
+
+
+class LiveTranscriber:
+    """Transcribes a Recorder's audio while the meeting is still going.
+
+    A background worker reads the blocks the recorder publishes, runs them
+    through VAD and the long-form windowing, and decodes each window (or
+    finished speech region) as soon as it is complete. When recording
+    stops only the last window is left to decode.
+    """
+
+    def __init__(self, recorder, model_name=DEFAULT_MODEL, vad=VAD_ENABLED):
+        self.recorder = recorder
+        self.model_name = model_name
+        self.vad = vad
+        self.detector = VoiceActivityDetector() if vad else None
+        self.segments = []
+        self.error = None
+        self._blocks = recorder.subscribe()
+        self._updated = threading.Condition()
+        self._done = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="live-transcriber", daemon=True)
+        self._thread.start()
+
+    def _iter_blocks(self):
+        resampler = None
+        if self.recorder.rate != TARGET_RATE:
+            resampler = PolyphaseResampler(self.recorder.rate, TARGET_RATE)
+        while True:
+            data = self._blocks.get()
+            if data is None:
+                break
+            block = downmix(pcm_to_float(data, SAMPLE_WIDTH, self.recorder.channels))
+            yield resampler.process(block) if resampler else block
+        if resampler:
+            yield resampler.flush()
+
+    def _iter_decoded(self, windows, processor, model):
+        """Decode each window the moment it's ready (batch size 1).
+
+        A transcribe slot is held only while decoding, so live and queued
+        transcriptions together stay within TRANSCRIBE_CONCURRENCY.
+        """
+        slot = get_job_queue().slot("transcribe")
+        for window in windows:
+            with slot:
+                decoded = list(iter_decoded_windows([window], processor, model, batch_size=1))
+            yield from decoded
+
+    def _run(self):
+        try:
+            processor, model = get_whisper(self.model_name)
+            blocks = self._iter_blocks()
+            if self.detector is not None:
+                blocks = self.detector.iter_speech(blocks, mark_boundaries=True)
+            decoded = self._iter_decoded(iter_windows(blocks), processor, model)
+            for segment in iter_merged_windows(decoded):
+                with self._updated:
+                    self.segments.append(segment)
+                    self._updated.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._updated:
+                self._done = True
+                self._updated.notify_all()
+
+    @property
+    def complete(self):
+        """False when audio was dropped because decoding fell behind real time"""
+        return self._blocks.dropped_bytes == 0
+
+    def text(self):
+        with self._updated:
+            return join_segments(self.segments)
+
+    def iter_text(self):
+        """Yield the transcript so far every time a new segment lands"""
+        seen = 0
+        while True:
+            with self._updated:
+                self._updated.wait_for(lambda: self._done or len(self.segments) > seen)
+                seen = len(self.segments)
+                done = self._done
+                text = join_segments(self.segments)
+            yield text
+            if done:
+                return
+
+    def wait(self):
+        """Block until the last window is decoded, save the transcript and return (text, segments)"""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        if self.detector is not None:
+            self.detector.map_segments(self.segments)
+        transcription = join_segments(self.segments)
+
+        output_path = os.path.splitext(self.recorder.path)[0] + '.txt'
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(transcription)
+        # Kept apart from transcribe_audio's entry: live windows are decoded incrementally,
+        # so "Transcribe" on this recording still runs the offline pass
+        if self.complete:
+            stats = self.detector.stats() if self.detector is not None else {}
+            store_transcript(transcript_key(self.recorder.path, self.model_name, vad=self.vad, windowing="live"),
+                             transcription, self.segments, stats)
+        return transcription, self.segments
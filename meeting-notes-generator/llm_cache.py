@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import tracing
+
+CACHE_DB = os.environ.get(
+    "LLM_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "llm_responses.db"),
+)
+# LLM_CACHE=0 bypasses the cache everywhere; callers can also pass use_cache=False
+CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") != "0"
+TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+MAX_CACHE_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def prompt_key(model, instructions, schema, prompt):
+    """Fingerprint everything that determines the response: model, instructions, output schema and input"""
+    payload = json.dumps(
+        {"model": model, "instructions": instructions, "schema": schema, "prompt": prompt},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of LLM responses keyed by prompt fingerprint.
+
+    Values are JSON (plain text or a model_dump() of a structured
+    response). Entries older than `ttl` seconds are treated as missing,
+    and once the stored values exceed `max_bytes` the least recently read
+    entries are evicted.
+    """
+
+    def __init__(self, db_path=CACHE_DB, ttl=TTL_SECONDS, max_bytes=MAX_CACHE_BYTES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        """A new connection; use as `with closing(self._connect()) as conn, conn:` to commit and close it"""
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            self._ready = True
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                tracing.count("llm_cache", result="miss")
+                return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                tracing.count("llm_cache", result="expired")
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        tracing.count("llm_cache", result="hit")
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self._evict(conn, now)
+
+    async def aget(self, key):
+        """get() on the default executor, so the event loop isn't blocked on SQLite"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def aput(self, key, value):
+        await asyncio.get_running_loop().run_in_executor(None, self.put, key, value)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until the cache fits in max_bytes"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._evict(conn, time.time())
+
+    def clear(self):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM responses")
+
+
+response_cache = ResponseCache()
+
+
+def cached_call(key, call, use_cache=True, dump=None, load=None):
+    """Return the cached response for `key`, or run `call()` and store its result.
+
+    `dump`/`load` convert structured responses to and from JSON-able data,
+    e.g. `MeetingMinutes.model_dump` / `MeetingMinutes.model_validate`.
+    """
+    if not (use_cache and CACHE_ENABLED):
+        return call()
+    cached = response_cache.get(key)
+    if cached is not None:
+        return load(cached) if load else cached
+    result = call()
+    response_cache.put(key, dump(result) if dump else result)
+    return result
+
+
+async def acached_call(key, call, use_cache=True, dump=None, load=None):
+    """cached_call for a coroutine function `call`; SQLite reads and writes run off the event loop"""
+    if not (use_cache and CACHE_ENABLED):
+        return await call()
+    cached = await response_cache.aget(key)
+    if cached is not None:
+        return load(cached) if load else cached
+    result = await call()
+    await response_cache.aput(key, dump(result) if dump else result)
+    return result
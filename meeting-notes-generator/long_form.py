@@ -0,0 +1,214 @@
+import os
+import re
+import tracing
+from dataclasses import dataclass, field
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30.0
+OVERLAP_SECONDS = 5.0
+BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "8"))
+
+
+@dataclass
+class Segment:
+    start: float
+    end: float
+    text: str
+    # [start, end, text] phrases timed by Whisper's timestamp tokens, on the same timeline
+    chunks: list = field(default_factory=list)
+
+
+def iter_windows(blocks, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS,
+                 overlap_seconds=OVERLAP_SECONDS):
+    """Cut a stream of audio blocks into overlapping fixed-size windows.
+
+    Yields (start_seconds, window) pairs. Only one window plus the current
+    block is held in memory, so `blocks` can be an arbitrarily long stream.
+    A `None` block marks a boundary (e.g. the end of a speech region): the
+    audio collected so far is emitted as a short window straight away and
+    the next window starts fresh without overlap.
+    """
+    window = int(window_seconds * sample_rate)
+    step = window - int(overlap_seconds * sample_rate)
+    if step <= 0:
+        raise ValueError("overlap must be shorter than the window")
+
+    buffer = np.zeros(0, dtype=np.float32)
+    pending, pending_len = [], 0
+    offset = 0
+    emitted = False
+
+    def tail():
+        # Whatever is left past the last full window's overlap is new audio
+        if len(buffer) > (window - step if emitted else 0):
+            yield offset / sample_rate, buffer
+
+    for block in blocks:
+        if block is None:
+            if pending:
+                buffer = np.concatenate([buffer] + pending)
+                pending, pending_len = [], 0
+            yield from tail()
+            offset += len(buffer)
+            buffer = np.zeros(0, dtype=np.float32)
+            emitted = False
+            continue
+
+        # Collect small blocks and only concatenate once a window is complete
+        pending.append(np.asarray(block, dtype=np.float32))
+        pending_len += len(pending[-1])
+        if len(buffer) + pending_len < window:
+            continue
+        buffer = np.concatenate([buffer] + pending)
+        pending, pending_len = [], 0
+        while len(buffer) >= window:
+            yield offset / sample_rate, buffer[:window]
+            emitted = True
+            buffer = buffer[step:]
+            offset += step
+
+    if pending:
+        buffer = np.concatenate([buffer] + pending)
+    yield from tail()
+
+
+def split_windows(audio, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS,
+                  overlap_seconds=OVERLAP_SECONDS):
+    return list(iter_windows([audio], sample_rate, window_seconds, overlap_seconds))
+
+
+def decode_batch(chunks, processor, model, sample_rate=SAMPLE_RATE):
+    """Run one batch of <=30 s chunks through Whisper.
+
+    Returns each chunk's text and its phrases as (start, end, text) with
+    times relative to the chunk, from Whisper's timestamp tokens.
+    """
+    import torch
+
+    # ONNX Runtime models have no dtype; they take fp32 features
+    with tracing.span("whisper.features", batch=len(chunks)):
+        input_features = processor(
+            list(chunks), sampling_rate=sample_rate, return_tensors="pt"
+        ).input_features.to(model.device, getattr(model, "dtype", torch.float32))
+    with tracing.span("whisper.generate", batch=len(chunks)), torch.inference_mode():
+        predicted_ids = model.generate(input_features, return_timestamps=True)
+    with tracing.span("whisper.decode", batch=len(chunks)):
+        texts = processor.batch_decode(predicted_ids, skip_special_tokens=True)
+        phrases = [
+            [(offset["timestamp"][0], offset["timestamp"][1], offset["text"].strip())
+             for offset in processor.tokenizer.decode(ids, skip_special_tokens=True, output_offsets=True)["offsets"]]
+            for ids in predicted_ids
+        ]
+    tracing.count("windows_decoded", len(chunks))
+    tracing.count("whisper_tokens_out", int(predicted_ids.numel()))
+    return texts, phrases
+
+
+def iter_decoded_windows(windows, processor, model, batch_size=BATCH_SIZE,
+                         sample_rate=SAMPLE_RATE):
+    """Decode (start, window) pairs in batches, yielding (start, end, text, phrases)"""
+    batch = []
+    for start, chunk in windows:
+        batch.append((start, chunk))
+        if len(batch) == batch_size:
+            yield from _decode(batch, processor, model, sample_rate)
+            batch = []
+    if batch:
+        yield from _decode(batch, processor, model, sample_rate)
+
+
+def _decode(batch, processor, model, sample_rate):
+    texts, phrases = decode_batch([chunk for _, chunk in batch], processor, model, sample_rate)
+    for (start, chunk), text, window_phrases in zip(batch, texts, phrases):
+        end = start + len(chunk) / sample_rate
+        # Timestamps are clipped to the window; Whisper can overshoot on padded audio
+        yield start, end, text.strip(), [
+            [start + min(phrase_start, end - start), start + min(phrase_end, end - start), phrase]
+            for phrase_start, phrase_end, phrase in window_phrases if phrase
+        ]
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def overlap_length(previous_words, next_words, max_words=40):
+    """Number of leading words of `next_words` already present at the end of `previous_words`"""
+    previous = [_normalize(w) for w in previous_words[-max_words:]]
+    upcoming = [_normalize(w) for w in next_words[:max_words]]
+    for size in range(min(len(previous), len(upcoming)), 0, -1):
+        if previous[-size:] == upcoming[:size]:
+            return size
+    return 0
+
+
+def _drop_leading_words(phrases, count):
+    """`phrases` without their first `count` words"""
+    kept = []
+    for start, end, text in phrases:
+        words = text.split()
+        if count >= len(words):
+            count -= len(words)
+            continue
+        kept.append([start, end, " ".join(words[count:])])
+        count = 0
+    return kept
+
+
+def iter_merged_windows(decoded):
+    """Stitch decoded windows into segments, dropping text repeated across overlaps.
+
+    Segment boundaries are placed in the middle of each overlap so the
+    segments tile the timeline without gaps or double coverage. Segments
+    are yielded as soon as their window is decoded; the previous segment's
+    `end` is pulled back once the next overlapping window arrives.
+    """
+    previous = None
+    previous_words = []
+    for start, end, text, phrases in decoded:
+        words = text.split()
+        if previous is not None and previous.end > start:
+            repeated = overlap_length(previous_words, words)
+            words = words[repeated:]
+            phrases = _drop_leading_words(phrases, repeated)
+            boundary = (start + previous.end) / 2
+            previous.end = boundary
+            start = boundary
+        previous = Segment(start=start, end=end, text=" ".join(words), chunks=phrases)
+        previous_words = text.split()
+        yield previous
+
+
+def merge_windows(decoded):
+    return list(iter_merged_windows(decoded))
+
+
+def _report_progress(decoded, progress):
+    for start, end, text, phrases in decoded:
+        progress(end)
+        yield start, end, text, phrases
+
+
+def join_segments(segments):
+    return " ".join(segment.text for segment in segments if segment.text).strip()
+
+
+def transcribe_long_form(audio, processor, model, sample_rate=SAMPLE_RATE,
+                         batch_size=BATCH_SIZE, window_seconds=WINDOW_SECONDS,
+                         overlap_seconds=OVERLAP_SECONDS, progress=None):
+    """Transcribe audio of any length with batched, overlapping 30 s windows.
+
+    `audio` is either a 1-D array or an iterable of 1-D blocks at
+    `sample_rate`. `progress`, if given, is called with the seconds of
+    audio decoded so far after each window; it may raise to abort.
+    Returns (text, segments).
+    """
+    blocks = [audio] if isinstance(audio, np.ndarray) else audio
+    windows = iter_windows(blocks, sample_rate, window_seconds, overlap_seconds)
+    decoded = iter_decoded_windows(windows, processor, model, batch_size, sample_rate)
+    if progress is not None:
+        decoded = _report_progress(decoded, progress)
+    segments = merge_windows(decoded)
+    return join_segments(segments), segments
@@ -1,16 +1,23 @@
+import asyncio
 import os
-import wave
-import numpy as np
+import weakref
+from functools import lru_cache, partial
 from textwrap import dedent
-from typing import Iterator
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
+from typing import AsyncIterator, Iterator, Optional
+import tracing
+from audio_io import wav_info
+from diarization import DIARIZATION_ENABLED, Turn, diarize, render_timeline, turn_segments
+from llm_cache import acached_call, cached_call, prompt_key
+from long_form import Segment
+from summarize import (
+    CHUNK_TOKENS, amap_reduce, chunk_segments, dedupe_action_items, dedupe_strings, estimate_tokens,
+    map_reduce,
+)
+from search_index import get_search_index
+from transcribe_audio import run_transcription, transcribe_segments
 
-from agno.agent import Agent
-from agno.models.aws.bedrock import AwsBedrock
-from agno.storage.sqlite import SqliteStorage
 from agno.workflow import Workflow, RunResponse
 from agno.utils.log import logger
-from agno.utils.pprint import pprint_run_response
 from pydantic import BaseModel, Field
 
 # Models for storing data
@@ -28,16 +35,64 @@ class MeetingMinutes(BaseModel):
     summary: str = Field(..., description="Brief summary of the meeting")
     raw_transcript: str = Field(..., description="The raw meeting transcript")
 
-class MeetingNotesWorkflow(Workflow):
-    description: str = "Generate meeting minutes from WAV audio recordings using Agno workflow"
+class ChunkNotes(BaseModel):
+    participants: list[str] = Field(..., description="Speakers identified in this part")
+    key_points: list[str] = Field(..., description="Key discussion points in this part")
+    action_items: list[ActionItem] = Field(..., description="Action items raised in this part")
+    decisions: list[str] = Field(..., description="Decisions made in this part")
 
-    # Initialize Whisper model and processor once
-    whisper_processor = WhisperProcessor.from_pretrained("openai/whisper-base")
-    whisper_model = WhisperForConditionalGeneration.from_pretrained("openai/whisper-base")
-    
-    minutes_generator: Agent = Agent(
+def render_chunk_notes(notes: ChunkNotes) -> str:
+    lines = [f"Participants: {', '.join(notes.participants)}", "Key points:"]
+    lines += [f"- {point}" for point in notes.key_points]
+    lines.append("Action items:")
+    lines += [f"- {item.assignee}: {item.description}" for item in notes.action_items]
+    lines.append("Decisions:")
+    lines += [f"- {decision}" for decision in notes.decisions]
+    return "\n".join(lines)
+
+MODEL_ID = "anthropic.claude-3-5-sonnet-20240620-v1:0"
+# Concurrent async Bedrock calls per event loop, across all workflow runs
+AGENT_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "4"))
+_agent_limits = weakref.WeakKeyDictionary()
+
+def _agent_limit():
+    loop = asyncio.get_running_loop()
+    if loop not in _agent_limits:
+        _agent_limits[loop] = asyncio.Semaphore(AGENT_CONCURRENCY)
+    return _agent_limits[loop]
+
+# Agents are built on first use so importing this module doesn't pull in
+# the Bedrock client stack
+@lru_cache(maxsize=None)
+def chunk_summarizer_template():
+    from agno.agent import Agent
+    from agno.models.aws.bedrock import AwsBedrock
+
+    return Agent(
+        name="ChunkSummarizer",
+        model=AwsBedrock(id=MODEL_ID),
+        description="Summarizes one part of a long meeting transcript",
+        instructions=dedent("""\
+        The provided text is one consecutive part of a longer meeting transcript.
+        Extract only what is said in this part:
+        1. Participants (identify speakers)
+        2. Key discussion points
+        3. Action items with clear assignees
+        4. Decisions made
+        Lines may be labelled with speakers (S1, S2, ...); keep those labels
+        when attributing points and action items.
+        """),
+        response_model=ChunkNotes,
+    )
+
+@lru_cache(maxsize=None)
+def minutes_generator_template():
+    from agno.agent import Agent
+    from agno.models.aws.bedrock import AwsBedrock
+
+    return Agent(
         name="MinutesGenerator",
-        model=BedrockClaude(id="anthropic.claude-3-5-sonnet-20240620-v1:0"),
+        model=AwsBedrock(id=MODEL_ID),
         description="Meeting minutes generation specialist",
         instructions=dedent("""\
         Analyze the provided transcript and generate structured meeting minutes.
@@ -48,69 +103,230 @@ class MeetingNotesWorkflow(Workflow):
         4. Action items with clear assignees
         5. Decisions made
         6. A concise meeting summary
-        
+
+        The transcript may be a speaker timeline ("[mm:ss] S1: ..."). Use the
+        speaker labels to list participants and to assign action items, and
+        replace a label with a name wherever the conversation reveals it.
+
         Format the minutes professionally while maintaining the original meaning.
         """),
         response_model=MeetingMinutes,
     )
 
-    def transcribe_audio(self, audio_path: str) -> str:
-        """Transcribe WAV audio file using Whisper model"""
+class MeetingNotesWorkflow(Workflow):
+    description: str = "Generate meeting minutes from WAV audio recordings using Agno workflow"
+    # Set to False to always call the model instead of reusing cached responses
+    use_llm_cache: bool = True
+
+    # Each access returns a fresh copy; an Agent keeps per-run state, so
+    # concurrent chunk summaries must not share one
+    @property
+    def chunk_summarizer(self):
+        return chunk_summarizer_template().deep_copy()
+
+    @property
+    def minutes_generator(self):
+        return minutes_generator_template().deep_copy()
+
+    def transcribe_with_segments(self, audio_path: str, progress=None,
+                                 use_cache: bool = True) -> tuple[str, list[Segment]]:
+        """Transcribe WAV audio file using Whisper, returning text and timed segments"""
         logger.info(f"Transcribing: {audio_path}")
         
         try:
-            # Load and process audio
-            with wave.open(audio_path, 'rb') as wf:
-                frames = wf.getnframes()
-                rate = wf.getframerate()
-                raw_data = wf.readframes(frames)
+            info = wav_info(audio_path)
+            if info["rate"] != 16000 or info["channels"] != 1:
+                logger.info(f"Resampling {info['channels']}ch {info['rate']}Hz audio to mono 16000Hz")
             
-            # Normalize audio data
-            audio = np.frombuffer(raw_data, dtype=np.int16).astype(np.float32) / 32768.0
-            
-            # Resample if needed
-            if rate != 16000:
-                logger.info(f"Resampling from {rate}Hz to 16000Hz")
-                audio = np.interp(
-                    np.linspace(0, len(audio), int(len(audio) * 16000 / rate)),
-                    np.arange(len(audio)),
-                    audio
+            # Long-form chunked transcription with the process-wide shared model
+            vad_stats = {}
+            transcription, segments = transcribe_segments(audio_path, stats=vad_stats, progress=progress,
+                                                           use_cache=use_cache)
+            logger.info(f"Decoded {len(segments)} windows")
+            if vad_stats.get("cached"):
+                logger.info("Transcript served from cache")
+            elif vad_stats:
+                logger.info(
+                    f"VAD skipped {vad_stats['skipped_seconds']:.1f}s of "
+                    f"{vad_stats['audio_seconds']:.1f}s ({vad_stats['skipped_ratio']:.0%})"
                 )
             
-            # Process with Whisper
-            input_features = self.whisper_processor(
-                audio, sampling_rate=16000, return_tensors="pt"
-            ).input_features
-            
-            predicted_ids = self.whisper_model.generate(input_features)
-            transcription = self.whisper_processor.batch_decode(
-                predicted_ids, skip_special_tokens=True
-            )[0]
-            
             # Save transcript for reference
             output_path = os.path.splitext(audio_path)[0] + '.txt'
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(transcription)
             
             logger.info(f"Transcript saved to: {output_path}")
-            return transcription
+            return transcription, segments
             
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
             raise
 
-    def run(self, wav_path: str) -> Iterator[RunResponse]:
-        # Step 1: Transcribe audio with Whisper
-        transcript = self.transcribe_audio(wav_path)
-        logger.info(f"Transcription complete: {len(transcript)} characters")
-        
-        # Step 2: Generate meeting minutes from transcript
-        minutes_response = yield from self.minutes_generator.run(
-            transcript=transcript
+    def transcribe_audio(self, audio_path: str) -> str:
+        """Transcribe WAV audio file using Whisper model"""
+        transcription, _ = self.transcribe_with_segments(audio_path)
+        return transcription
+
+    def _agent_cache_key(self, agent, message: str) -> str:
+        return prompt_key(
+            MODEL_ID, [agent.description, agent.instructions], agent.response_model.model_json_schema(), message
         )
-        
-        logger.info(f"Minutes generated for: {minutes_response.title}")
-        return minutes_response
+
+    def _run_agent(self, agent, message: str, stage: str):
+        """Run an agent, reusing the cached structured response for an identical request"""
+        return cached_call(self._agent_cache_key(agent, message), partial(self._call_agent, agent, message, stage),
+                           self.use_llm_cache, dump=lambda result: result.model_dump(),
+                           load=agent.response_model.model_validate)
+
+    async def _arun_agent(self, agent, message: str, stage: str):
+        return await acached_call(self._agent_cache_key(agent, message),
+                                  partial(self._acall_agent, agent, message, stage), self.use_llm_cache,
+                                  dump=lambda result: result.model_dump(),
+                                  load=agent.response_model.model_validate)
+
+    def _count_agent_tokens(self, response, message: str):
+        if tracing.enabled():
+            metrics = getattr(response, "metrics", None) or {}
+            tokens_in = sum(metrics.get("input_tokens") or []) or estimate_tokens(message)
+            tokens_out = sum(metrics.get("output_tokens") or [])
+            tracing.count("llm_tokens_in", tokens_in, model=MODEL_ID)
+            tracing.count("llm_tokens_out", tokens_out, model=MODEL_ID)
+
+    def _call_agent(self, agent, message: str, stage: str):
+        """Run an agent under a span and add its token usage to the LLM counters"""
+        with tracing.span("llm.call", model=MODEL_ID, stage=stage):
+            response = agent.run(message)
+        self._count_agent_tokens(response, message)
+        return response.content
+
+    async def _acall_agent(self, agent, message: str, stage: str):
+        async with _agent_limit():
+            with tracing.span("llm.call", model=MODEL_ID, stage=stage):
+                response = await agent.arun(message)
+        self._count_agent_tokens(response, message)
+        return response.content
+
+    def _summarize_chunk(self, chunk: str) -> str:
+        notes = self._run_agent(self.chunk_summarizer, chunk, "chunk")
+        return render_chunk_notes(notes)
+
+    async def _asummarize_chunk(self, chunk: str) -> str:
+        notes = await self._arun_agent(self.chunk_summarizer, chunk, "chunk")
+        return render_chunk_notes(notes)
+
+    def _reduce_prompt(self, partials: list[str]) -> str:
+        notes = "\n\n".join(f"Part {i}:\n{part}" for i, part in enumerate(partials, 1))
+        return dedent(f"""\
+        The transcript was too long to read at once, so it was summarized part by part.
+        Generate the meeting minutes from these notes, merging duplicates across parts.
+        Leave raw_transcript empty.
+
+        {notes}
+        """)
+
+    def _reduce_notes(self, partials: list[str]) -> MeetingMinutes:
+        return self._run_agent(self.minutes_generator, self._reduce_prompt(partials), "reduce")
+
+    async def _areduce_notes(self, partials: list[str]) -> MeetingMinutes:
+        return await self._arun_agent(self.minutes_generator, self._reduce_prompt(partials), "reduce")
+
+    def _finish_minutes(self, minutes: MeetingMinutes, transcript: str) -> MeetingMinutes:
+        minutes.action_items = dedupe_action_items(minutes.action_items)
+        minutes.decisions = dedupe_strings(minutes.decisions)
+        minutes.raw_transcript = transcript
+        return minutes
+
+    def _llm_input(self, transcript: str, segments: list[Segment], turns: Optional[list[Turn]]):
+        """The speaker timeline replaces the flat transcript when diarization produced one"""
+        if not turns:
+            return transcript, segments
+        timeline = render_timeline(turns)
+        saved = estimate_tokens(transcript) - estimate_tokens(timeline)
+        tracing.count("diarization_tokens_saved", saved)
+        logger.info(f"Speaker timeline: {len({t.speaker for t in turns})} speakers, {len(turns)} turns, "
+                    f"~{saved} tokens saved")
+        return timeline, turn_segments(turns)
+
+    def diarize(self, audio_path: str, segments: list[Segment]) -> Optional[list[Turn]]:
+        if not DIARIZATION_ENABLED:
+            return None
+        try:
+            return diarize(audio_path, segments)
+        except Exception as e:
+            logger.warning(f"Diarization failed, using the flat transcript: {e}")
+            return None
+
+    def generate_minutes(self, transcript: str, segments: list[Segment],
+                         turns: Optional[list[Turn]] = None) -> MeetingMinutes:
+        """Generate minutes in one call, or map-reduce over chunks for long transcripts"""
+        text, segments = self._llm_input(transcript, segments, turns)
+        with tracing.span("minutes.generate", model=MODEL_ID) as span:
+            if estimate_tokens(text) <= CHUNK_TOKENS:
+                minutes = self._run_agent(self.minutes_generator, text, "minutes")
+            else:
+                chunks = chunk_segments(segments)
+                logger.info(f"Transcript exceeds one prompt; summarizing {len(chunks)} chunks in parallel")
+                span.set(chunks=len(chunks))
+                minutes = map_reduce(chunks, self._summarize_chunk, self._reduce_notes)
+        return self._finish_minutes(minutes, transcript)
+
+    async def agenerate_minutes(self, transcript: str, segments: list[Segment],
+                                turns: Optional[list[Turn]] = None) -> MeetingMinutes:
+        """Async generate_minutes; cancelling the awaiting task cancels every in-flight agent call"""
+        text, segments = self._llm_input(transcript, segments, turns)
+        with tracing.span("minutes.generate", model=MODEL_ID) as span:
+            if estimate_tokens(text) <= CHUNK_TOKENS:
+                minutes = await self._arun_agent(self.minutes_generator, text, "minutes")
+            else:
+                chunks = chunk_segments(segments)
+                logger.info(f"Transcript exceeds one prompt; summarizing {len(chunks)} chunks concurrently")
+                span.set(chunks=len(chunks))
+                minutes = await amap_reduce(chunks, self._asummarize_chunk, self._areduce_notes)
+        return self._finish_minutes(minutes, transcript)
+
+    def _store_minutes(self, minutes: MeetingMinutes, segments: list[Segment], wav_path: str):
+        logger.info(f"Minutes generated for: {minutes.title}")
+        try:
+            get_search_index().index_minutes(self.session_id, minutes, segments, source=wav_path)
+        except Exception as e:
+            logger.warning(f"Search indexing failed: {e}")
+        # Kept in session state so storage records which recordings are finished (and
+        # search_index.index_storage can link them back to the recording)
+        self.session_state["minutes"] = minutes.model_dump()
+        self.session_state["audio_path"] = wav_path
+
+    def run(self, wav_path: str) -> Iterator[RunResponse]:
+        with tracing.span("workflow.run", session_id=self.session_id):
+            # Step 1: Transcribe audio with Whisper
+            transcript, segments = self.transcribe_with_segments(wav_path)
+            logger.info(f"Transcription complete: {len(transcript)} characters")
+
+            # Step 2: Label speakers so the LLM reads a compact turn timeline
+            turns = self.diarize(wav_path, segments)
+
+            # Step 3: Generate meeting minutes from transcript
+            minutes = self.generate_minutes(transcript, segments, turns)
+
+        self._store_minutes(minutes, segments, wav_path)
+        yield RunResponse(run_id=self.run_id, content=minutes)
+
+    async def arun(self, wav_path: str, progress=None) -> AsyncIterator[RunResponse]:
+        """Async run: Whisper runs as a transcription job on the job queue and agent calls are awaited.
+
+        Cancelling the consuming task (e.g. a disconnected UI client) stops
+        transcription at the next decoded batch and cancels pending LLM calls.
+        """
+        with tracing.span("workflow.run", session_id=self.session_id):
+            transcript, segments = await run_transcription(self.transcribe_with_segments, wav_path,
+                                                           progress=progress)
+            logger.info(f"Transcription complete: {len(transcript)} characters")
+            turns = await run_transcription(lambda progress: self.diarize(wav_path, segments))
+            minutes = await self.agenerate_minutes(transcript, segments, turns)
+
+        # Indexing may embed every segment, so keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._store_minutes, minutes, segments, wav_path)
+        yield RunResponse(run_id=self.run_id, content=minutes)
 
 def save_minutes_to_markdown(minutes, output_path):
     """Save meeting minutes to markdown file"""
@@ -140,11 +356,19 @@ def save_minutes_to_markdown(minutes, output_path):
         for decision in minutes['decisions']:
             f.write(f"- {decision}\n")
 
+DB_FILE = "meeting_notes.db"
+TABLE_NAME = "meeting_workflow_sessions"
+
 def main():
+    from agno.storage.sqlite import SqliteStorage
+    from agno.utils.pprint import pprint_run_response
+
+    tracing.configure_from_env()
+
     # Initialize SQLite storage
     storage = SqliteStorage(
-        table_name="meeting_workflow_sessions",
-        db_file="meeting_notes.db"
+        table_name=TABLE_NAME,
+        db_file=DB_FILE
     )
     
     # Setup workflow
@@ -165,7 +389,7 @@ def main():
     # Save output if workflow completed successfully
     if response:
         output_path = os.path.splitext(wav_path)[0] + "_minutes.md"
-        save_minutes_to_markdown(response.model_dump(), output_path)
+        save_minutes_to_markdown(response.content.model_dump(), output_path)
         print(f"Meeting minutes saved to {output_path}")
 
 if __name__ == "__main__":
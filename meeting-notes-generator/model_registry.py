@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+from whisper_backends import WHISPER_BACKEND, default_device, get_backend
+
+DEFAULT_MODEL = os.environ.get("WHISPER_MODEL", "openai/whisper-base")
+MAX_LOADED_MODELS = int(os.environ.get("WHISPER_MAX_LOADED_MODELS", "2"))
+
+
+def resolve_dtype(dtype):
+    import torch
+    if dtype is None:
+        return torch.float32
+    if isinstance(dtype, str):
+        return getattr(torch, dtype)
+    return dtype
+
+
+class WhisperModelRegistry:
+    """Process-wide cache of Whisper processor/model pairs.
+
+    Entries are keyed by (model name, device, dtype, backend) and loaded
+    lazily on first use. Once more than `max_models` entries are loaded,
+    the least recently used one is evicted.
+    """
+
+    def __init__(self, max_models=MAX_LOADED_MODELS):
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def _key(self, model_name, device, dtype, backend):
+        device = device or default_device(backend)
+        dtype = resolve_dtype(dtype)
+        return (model_name, str(device), str(dtype).replace("torch.", ""), backend), device, dtype
+
+    def get(self, model_name=DEFAULT_MODEL, device=None, dtype=None, backend=WHISPER_BACKEND):
+        """Return (processor, model), loading them on first use"""
+        key, device, dtype = self._key(model_name, device, dtype, backend)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Loads of different models can run in parallel; concurrent requests
+        # for the same model wait for the first one instead of loading twice.
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            entry = get_backend(backend).load(model_name, device, dtype)
+
+            with self._lock:
+                self._models[key] = entry
+                self._models.move_to_end(key)
+                while len(self._models) > self.max_models:
+                    evicted, _ = self._models.popitem(last=False)
+                    self._release(evicted)
+                self._load_locks.pop(key, None)
+        return entry
+
+    def _release(self, key):
+        if key[1].startswith("cuda"):
+            import torch
+            torch.cuda.empty_cache()
+
+    def warm_up(self, model_names=(DEFAULT_MODEL,), device=None, dtype=None, background=False,
+                backend=WHISPER_BACKEND):
+        """Preload models so the first transcription doesn't pay the load cost"""
+        def load_all():
+            for name in model_names:
+                self.get(name, device, dtype, backend)
+
+        if background:
+            thread = threading.Thread(target=load_all, name="whisper-warm-up", daemon=True)
+            thread.start()
+            return thread
+        load_all()
+        return None
+
+    def unload(self, model_name=None, device=None, dtype=None, backend=WHISPER_BACKEND):
+        """Drop one cached model, or every cached model if no name is given"""
+        with self._lock:
+            if model_name is None:
+                keys = list(self._models)
+            else:
+                key, _, _ = self._key(model_name, device, dtype, backend)
+                keys = [key] if key in self._models else []
+            for key in keys:
+                del self._models[key]
+                self._release(key)
+        return len(keys)
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models)
+
+
+registry = WhisperModelRegistry()
+
+
+def get_whisper(model_name=DEFAULT_MODEL, device=None, dtype=None, backend=WHISPER_BACKEND):
+    return registry.get(model_name, device, dtype, backend)
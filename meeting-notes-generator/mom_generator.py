@@ -1,32 +1,250 @@
+import asyncio
 import os
+import threading
+import time
+import weakref
 from datetime import datetime
-from openai import OpenAI
+import tracing
+from functools import partial
+from llm_cache import CACHE_ENABLED, acached_call, cached_call, prompt_key, response_cache
+from summarize import CHUNK_TOKENS, amap_reduce, chunk_text, estimate_tokens, map_reduce
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", 'http://localhost:11434/v1')
+MODEL = os.environ.get("MINUTES_MODEL", "llama3")
+# Concurrent async LLM requests per event loop
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "4"))
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide client, so its connection pool is reused across calls"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Imported here so importing this module stays cheap
+            from openai import OpenAI
+            _client = OpenAI(
+                base_url=OLLAMA_BASE_URL,
+                api_key='ollama'
+            )
+    return _client
+
+# One pooled AsyncOpenAI client and concurrency limit per event loop; both are bound to the loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    """Return (client, semaphore) for the running event loop, creating them on first use"""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        from openai import AsyncOpenAI
+        entry = (AsyncOpenAI(base_url=OLLAMA_BASE_URL, api_key='ollama'), asyncio.Semaphore(LLM_CONCURRENCY))
+        _async_clients[loop] = entry
+    return entry
 
 def read_transcription(file_path):
     with open(file_path, 'r') as file:
         return file.read()
 
-def generate_minutes(transcription):
-    client = OpenAI(
-        base_url='http://localhost:11434/v1',
-        api_key='ollama'
-    )    
+def build_messages(transcription):
     prompt = f"""Please generate formal meeting minutes from the following transcription.
     Include:
     - Key discussion points
     - Action items
     - Decisions made
+    If lines are labelled with speakers (S1, S2, ...), use the labels to say
+    who raised each point and who owns each action item.
 
     Transcription:
     {transcription}
     """
-    
-    response = client.chat.completions.create(
-        model="llama3",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return [{"role": "user", "content": prompt}]
+
+def build_chunk_messages(chunk):
+    prompt = f"""The following is one part of a longer meeting transcription.
+    Write concise notes for this part only, listing:
+    - Key discussion points
+    - Action items, with the person responsible
+    - Decisions made
+    Keep speaker labels (S1, S2, ...) if the lines have them.
+
+    Transcription part:
+    {chunk}
+    """
+    return [{"role": "user", "content": prompt}]
+
+def build_reduce_messages(partials):
+    notes = "\n\n".join(f"Part {i}:\n{notes}" for i, notes in enumerate(partials, 1))
+    prompt = f"""Please generate formal meeting minutes from the following notes, taken
+    part by part over one meeting. Merge them into a single document and list
+    each action item and decision only once.
+    Include:
+    - Key discussion points
+    - Action items
+    - Decisions made
+
+    Notes:
+    {notes}
+    """
+    return [{"role": "user", "content": prompt}]
+
+def _count_tokens(messages, text, usage=None):
+    # Prefer the server's counts; local servers often omit or zero them
+    if usage is not None and usage.prompt_tokens:
+        tokens_in, tokens_out = usage.prompt_tokens, usage.completion_tokens
+    else:
+        tokens_in = sum(estimate_tokens(m["content"]) for m in messages)
+        tokens_out = estimate_tokens(text)
+    tracing.count("llm_tokens_in", tokens_in, model=MODEL)
+    tracing.count("llm_tokens_out", tokens_out, model=MODEL)
+    return tokens_in, tokens_out
+
+def _cache_key(messages):
+    # The instructions are part of the prompt text here, and the output is free-form markdown
+    return prompt_key(MODEL, None, None, messages)
+
+def _complete(messages, use_cache=True):
+    return cached_call(_cache_key(messages), partial(_call, messages), use_cache)
+
+def _call(messages):
+    with tracing.span("llm.call", model=MODEL) as span:
+        response = get_client().chat.completions.create(
+            model=MODEL,
+            messages=messages
+        )
+        content = response.choices[0].message.content
+        if tracing.enabled():
+            tokens_in, tokens_out = _count_tokens(messages, content, getattr(response, "usage", None))
+            span.set(tokens_in=tokens_in, tokens_out=tokens_out)
+    return content
+
+def _stream(messages, use_cache=True):
+    key = _cache_key(messages)
+    if use_cache and CACHE_ENABLED:
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+    with tracing.span("llm.stream", model=MODEL) as span:
+        started = time.perf_counter()
+        stream = get_client().chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            stream=True
+        )
+        parts = []
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not parts:
+                    span.set(first_token_seconds=time.perf_counter() - started)
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+        if tracing.enabled():
+            tokens_in, tokens_out = _count_tokens(messages, "".join(parts))
+            span.set(tokens_in=tokens_in, tokens_out=tokens_out)
+    # Only reached when the stream ran to completion, so partial output is never cached
+    if use_cache and CACHE_ENABLED:
+        response_cache.put(key, "".join(parts))
+
+def _summarize_chunk(chunk, use_cache=True):
+    return _complete(build_chunk_messages(chunk), use_cache)
+
+def generate_minutes(transcription, use_cache=True):
+    """Generate minutes; identical requests are served from the response cache unless use_cache=False"""
+    with tracing.span("minutes.generate", model=MODEL) as span:
+        # Long transcripts are summarized part by part in parallel, then merged
+        if estimate_tokens(transcription) > CHUNK_TOKENS:
+            span.set(map_reduce=True)
+            return map_reduce(
+                chunk_text(transcription), partial(_summarize_chunk, use_cache=use_cache),
+                lambda partials: _complete(build_reduce_messages(partials), use_cache)
+            )
+        return _complete(build_messages(transcription), use_cache)
+
+def generate_minutes_stream(transcription, use_cache=True):
+    """Yield the minutes token by token as the model produces them"""
+    if estimate_tokens(transcription) > CHUNK_TOKENS:
+        # Only the final merge can be streamed; the chunk summaries run first
+        messages = map_reduce(chunk_text(transcription), partial(_summarize_chunk, use_cache=use_cache),
+                              build_reduce_messages)
+    else:
+        messages = build_messages(transcription)
+    yield from _stream(messages, use_cache)
+
+async def _acall(messages):
+    client, limit = get_async_client()
+    async with limit:
+        with tracing.span("llm.call", model=MODEL) as span:
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=messages
+            )
+            content = response.choices[0].message.content
+            if tracing.enabled():
+                tokens_in, tokens_out = _count_tokens(messages, content, getattr(response, "usage", None))
+                span.set(tokens_in=tokens_in, tokens_out=tokens_out)
+    return content
+
+async def _acomplete(messages, use_cache=True):
+    return await acached_call(_cache_key(messages), partial(_acall, messages), use_cache)
+
+async def _astream(messages, use_cache=True):
+    key = _cache_key(messages)
+    if use_cache and CACHE_ENABLED:
+        cached = await response_cache.aget(key)
+        if cached is not None:
+            yield cached
+            return
+    client, limit = get_async_client()
+    async with limit:
+        with tracing.span("llm.stream", model=MODEL) as span:
+            started = time.perf_counter()
+            stream = await client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                stream=True
+            )
+            parts = []
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not parts:
+                            span.set(first_token_seconds=time.perf_counter() - started)
+                        parts.append(chunk.choices[0].delta.content)
+                        yield parts[-1]
+            finally:
+                # Closes the HTTP response, so a cancelled request stops generating on the server
+                await stream.close()
+            if tracing.enabled():
+                tokens_in, tokens_out = _count_tokens(messages, "".join(parts))
+                span.set(tokens_in=tokens_in, tokens_out=tokens_out)
+    if use_cache and CACHE_ENABLED:
+        await response_cache.aput(key, "".join(parts))
+
+async def _asummarize_chunk(chunk, use_cache=True):
+    return await _acomplete(build_chunk_messages(chunk), use_cache)
+
+async def agenerate_minutes(transcription, use_cache=True):
+    """Async generate_minutes; cancelling the awaiting task cancels every in-flight request"""
+    with tracing.span("minutes.generate", model=MODEL) as span:
+        if estimate_tokens(transcription) > CHUNK_TOKENS:
+            span.set(map_reduce=True)
+            return await amap_reduce(
+                chunk_text(transcription), partial(_asummarize_chunk, use_cache=use_cache),
+                lambda partials: _acomplete(build_reduce_messages(partials), use_cache)
+            )
+        return await _acomplete(build_messages(transcription), use_cache)
+
+async def agenerate_minutes_stream(transcription, use_cache=True):
+    """Async generate_minutes_stream"""
+    if estimate_tokens(transcription) > CHUNK_TOKENS:
+        messages = await amap_reduce(chunk_text(transcription), partial(_asummarize_chunk, use_cache=use_cache),
+                                     build_reduce_messages)
+    else:
+        messages = build_messages(transcription)
+    async for token in _astream(messages, use_cache):
+        yield token
 
 def save_minutes(minutes, output_file, base_dir=None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,466 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+INDEX_DB = os.environ.get(
+    "SEARCH_INDEX_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_index.db"),
+)
+# Semantic search needs sentence-transformers; full-text search works without it
+EMBEDDINGS_ENABLED = os.environ.get("SEARCH_EMBEDDINGS", "0") == "1"
+EMBEDDING_MODEL = os.environ.get("SEARCH_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Plain-text transcripts are split into passages of about this many words
+PASSAGE_WORDS = 80
+
+KINDS = ("title", "summary", "participant", "key_point", "action_item", "decision", "transcript", "notes")
+STOPWORDS = frozenset(
+    "a about an and are as at be by did do does for from how i in is it of on or our so that the "
+    "this to was we were what when where which who why will with".split()
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    date TEXT,
+    source TEXT,
+    source_mtime REAL,
+    source_size INTEGER,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    meeting_id TEXT NOT NULL REFERENCES meetings(id),
+    kind TEXT NOT NULL,
+    start REAL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_meeting ON docs(meeting_id);
+CREATE INDEX IF NOT EXISTS meetings_date ON meetings(date);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    text, content='docs', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS vectors (
+    doc_id INTEGER PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+);
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO docs_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO docs_fts(docs_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    DELETE FROM vectors WHERE doc_id = old.id;
+END;
+"""
+
+
+def meeting_id_for(path):
+    return "file-" + hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+
+
+def _iso_date(value, fallback=None):
+    """Best-effort YYYY-MM-DD from an LLM-written date, else from `fallback` (a timestamp)"""
+    if value:
+        value = str(value).strip()
+        for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d/%m/%Y"):
+            try:
+                return datetime.strptime(value, fmt).date().isoformat()
+            except ValueError:
+                pass
+        match = re.search(r"\d{4}-\d{2}-\d{2}", value)
+        if match:
+            return match.group(0)
+    if fallback is not None:
+        return datetime.fromtimestamp(fallback).date().isoformat()
+    return None
+
+
+def _date_from_filename(path):
+    # minutes_YYYYMMDD_HHMMSS.md and recording_YYYYMMDD_HHMMSS_*.txt
+    match = re.search(r"(\d{8})_\d{6}", os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d").date().isoformat()
+    return None
+
+
+def _section_kind(heading):
+    heading = heading.lower()
+    for needle, kind in (("participant", "participant"), ("attendee", "participant"),
+                         ("decision", "decision"), ("action", "action_item"),
+                         ("summary", "summary"), ("discussion", "key_point"), ("key", "key_point")):
+        if needle in heading:
+            return kind
+    return "notes"
+
+
+def parse_minutes_markdown(text):
+    """Split a minutes markdown file into (title, date, [(kind, text), ...])"""
+    title, date, docs = None, None, []
+    kind = "notes"
+    summary = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith("# ") and title is None:
+            title = stripped[2:].strip()
+        elif stripped.startswith("#"):
+            kind = _section_kind(stripped.lstrip("#"))
+        elif stripped.lower().startswith(("**date:**", "date:")):
+            date = stripped.split(":", 1)[1].strip(" *")
+        elif kind == "summary":
+            summary.append(stripped)
+        else:
+            # "- **Alice**: send the report" -> "Alice: send the report"
+            docs.append((kind, re.sub(r"\*\*|__", "", stripped.lstrip("-*•0123456789. ")).strip()))
+    if summary:
+        docs.insert(0, ("summary", " ".join(summary)))
+    return title, date, [(k, t) for k, t in docs if t]
+
+
+def minutes_docs(minutes, segments=None):
+    """Flatten a MeetingMinutes (or its model_dump()) and transcript segments into index rows"""
+    if hasattr(minutes, "model_dump"):
+        minutes = minutes.model_dump()
+    docs = [("title", minutes.get("title") or None, None), ("summary", minutes.get("summary"), None)]
+    docs += [("participant", p, None) for p in minutes.get("participants") or []]
+    docs += [("key_point", p, None) for p in minutes.get("key_points") or []]
+    docs += [("decision", d, None) for d in minutes.get("decisions") or []]
+    for item in minutes.get("action_items") or []:
+        if hasattr(item, "model_dump"):
+            item = item.model_dump()
+        docs.append(("action_item", f"{item.get('assignee', '')}: {item.get('description', '')}", None))
+    if segments:
+        docs += [("transcript", s.text, s.start) for s in segments]
+    elif minutes.get("raw_transcript"):
+        docs += [("transcript", passage, None) for passage in split_passages(minutes["raw_transcript"])]
+    return [(kind, text.strip(), start) for kind, text, start in docs if text and text.strip()]
+
+
+def split_passages(text, words=PASSAGE_WORDS):
+    tokens = text.split()
+    return [" ".join(tokens[i:i + words]) for i in range(0, len(tokens), words)]
+
+
+def fts_query(text):
+    """Turn a free-form question into an FTS5 OR-query; bm25 ranks documents matching more terms higher"""
+    terms = [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+    terms = terms or re.findall(r"\w+", text.lower())
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+class Embedder:
+    """Lazily loaded sentence-transformers model producing unit-length float16 vectors"""
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+        vectors = self._model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float16)
+
+
+class SearchIndex:
+    """Incremental SQLite FTS5 index over meeting minutes and transcripts.
+
+    Every meeting is stored as short documents (title, summary, each
+    participant, key point, decision, action item and transcript segment)
+    so hits point at the exact decision or passage. Re-indexing a meeting
+    replaces its documents, and files whose size and mtime haven't changed
+    are skipped. With embeddings enabled each document also gets a float16
+    vector; semantic queries are a single matrix-vector product in NumPy
+    over a matrix that is reloaded only when the index changes.
+    """
+
+    def __init__(self, db_path=INDEX_DB, embeddings=EMBEDDINGS_ENABLED, embedder=None):
+        self.db_path = db_path
+        self.embeddings = embeddings
+        self.embedder = embedder or (Embedder() if embeddings else None)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._matrix = (None, None, None)  # (generation, doc ids, vectors)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """This thread's connection, opened on first use and reused; `with` on it only commits"""
+        conn = getattr(self._local, "conn", None)
+        # A forked child must not share its parent's SQLite handle
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def close(self):
+        """Close the calling thread's connection; the next call opens a new one"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _generation(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def index_minutes(self, meeting_id, minutes, segments=None, source=None, date=None):
+        """Index a MeetingMinutes object (or dict), replacing any earlier version"""
+        if hasattr(minutes, "model_dump"):
+            minutes = minutes.model_dump()
+        date = _iso_date(date or minutes.get("date"), time.time())
+        return self._replace(meeting_id, minutes.get("title"), date, minutes_docs(minutes, segments),
+                             source=source)
+
+    def index_file(self, path, force=False):
+        """Index a minutes .md or transcript .txt file; returns False if it was unchanged"""
+        stat = os.stat(path)
+        meeting_id = meeting_id_for(path)
+        if not force:
+            with self._connect() as conn:
+                row = conn.execute("SELECT source_mtime, source_size FROM meetings WHERE id = ?",
+                                   (meeting_id,)).fetchone()
+            if row is not None and row["source_mtime"] == stat.st_mtime and row["source_size"] == stat.st_size:
+                return False
+
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        fallback_date = _date_from_filename(path) or _iso_date(None, stat.st_mtime)
+        if path.lower().endswith(".md"):
+            title, date, docs = parse_minutes_markdown(text)
+            docs = [(kind, body, None) for kind, body in docs]
+            if title:
+                docs.insert(0, ("title", title, None))
+        else:
+            title, date = f"Transcript: {os.path.basename(path)}", None
+            docs = [("transcript", passage, None) for passage in split_passages(text)]
+        date = _iso_date(date) or fallback_date
+        self._replace(meeting_id, title, date, docs, source=os.path.abspath(path),
+                      mtime=stat.st_mtime, size=stat.st_size)
+        return True
+
+    def index_paths(self, paths):
+        """Index minutes and transcripts under `paths` (files or directories), dropping deleted files"""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files += [os.path.join(root, n) for n in names if n.lower().endswith((".md", ".txt"))]
+            elif os.path.isfile(path):
+                files.append(path)
+        # A diarized recording has both <rec>.txt and <rec>.speakers.txt; index only the timeline
+        timelines = {f[:-len(".speakers.txt")] for f in files if f.lower().endswith(".speakers.txt")}
+        flat = [f for f in files if f.lower().endswith(".txt") and os.path.splitext(f)[0] in timelines]
+        files = [f for f in files if f not in flat]
+        removed = sum(self.remove(meeting_id_for(f)) for f in flat)
+        changed = sum(self.index_file(f) for f in sorted(files))
+        removed += self.prune()
+        return {"files": len(files), "indexed": changed, "removed": removed}
+
+    def index_storage(self, storage):
+        """Index minutes persisted by MeetingNotesWorkflow runs in agno storage"""
+        count = 0
+        for session in storage.get_all_sessions():
+            state = (session.session_data or {}).get("session_state", {})
+            if state.get("minutes"):
+                self.index_minutes(session.session_id, state["minutes"], source=state.get("audio_path"))
+                count += 1
+        return count
+
+    def _replace(self, meeting_id, title, date, docs, source=None, mtime=None, size=None):
+        vectors = None
+        if self.embeddings and docs:
+            vectors = self.embedder.encode(text for _, text, _ in docs)
+        with self._write_lock, self._connect() as conn:
+            conn.execute("DELETE FROM docs WHERE meeting_id = ?", (meeting_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO meetings (id, title, date, source, source_mtime, source_size, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (meeting_id, title, date, source, mtime, size, time.time()),
+            )
+            for i, (kind, text, start) in enumerate(docs):
+                cursor = conn.execute("INSERT INTO docs (meeting_id, kind, start, text) VALUES (?, ?, ?, ?)",
+                                      (meeting_id, kind, start, text))
+                if vectors is not None:
+                    conn.execute("INSERT INTO vectors (doc_id, vector) VALUES (?, ?)",
+                                 (cursor.lastrowid, vectors[i].tobytes()))
+            conn.execute("INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                         "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+        return len(docs)
+
+    def remove(self, meeting_id):
+        with self._write_lock, self._connect() as conn:
+            conn.execute("DELETE FROM docs WHERE meeting_id = ?", (meeting_id,))
+            deleted = conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,)).rowcount
+            conn.execute("INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                         "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+        return bool(deleted)
+
+    def prune(self):
+        """Remove meetings indexed from files that no longer exist"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, source FROM meetings WHERE source_mtime IS NOT NULL").fetchall()
+        return sum(self.remove(row["id"]) for row in rows if not os.path.exists(row["source"]))
+
+    def _filters(self, kinds, since, until):
+        clauses, params = [], []
+        if kinds:
+            clauses.append(f"d.kind IN ({','.join('?' * len(kinds))})")
+            params += list(kinds)
+        if since:
+            clauses.append("m.date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("m.date <= ?")
+            params.append(until)
+        return "".join(f" AND {c}" for c in clauses), params
+
+    def _fulltext(self, conn, query, limit, kinds, since, until):
+        match = fts_query(query)
+        if not match:
+            return []
+        where, params = self._filters(kinds, since, until)
+        return conn.execute(
+            "SELECT d.id AS doc_id, d.meeting_id, d.kind, d.start, d.text, m.title, m.date, m.source, "
+            "snippet(docs_fts, 0, '**', '**', '…', 16) AS snippet, -bm25(docs_fts) AS score "
+            "FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid JOIN meetings m ON m.id = d.meeting_id "
+            f"WHERE docs_fts MATCH ?{where} ORDER BY bm25(docs_fts) LIMIT ?",
+            [match] + params + [limit],
+        ).fetchall()
+
+    def _load_matrix(self, conn):
+        generation = self._generation(conn)
+        if self._matrix[0] != generation:
+            rows = conn.execute("SELECT doc_id, vector FROM vectors ORDER BY doc_id").fetchall()
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            if rows:
+                vectors = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float16)
+                vectors = vectors.reshape(len(rows), -1).astype(np.float32)
+            else:
+                vectors = np.zeros((0, 0), dtype=np.float32)
+            self._matrix = (generation, ids, vectors)
+        return self._matrix[1], self._matrix[2]
+
+    def _semantic(self, conn, query, limit, kinds, since, until):
+        if not self.embeddings:
+            raise RuntimeError("Semantic search is off; set SEARCH_EMBEDDINGS=1 and re-index")
+        ids, vectors = self._load_matrix(conn)
+        if not len(ids):
+            return []
+        scores = vectors @ self.embedder.encode([query])[0].astype(np.float32)
+        where, params = self._filters(kinds, since, until)
+        if where:
+            allowed = [row[0] for row in conn.execute(
+                f"SELECT d.id FROM docs d JOIN meetings m ON m.id = d.meeting_id WHERE 1 = 1{where}", params
+            )]
+            scores[~np.isin(ids, allowed)] = -np.inf
+        k = min(len(ids), limit)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = [i for i in top[np.argsort(-scores[top])] if np.isfinite(scores[i])]
+        if not top:
+            return []
+        rows = conn.execute(
+            "SELECT d.id AS doc_id, d.meeting_id, d.kind, d.start, d.text, m.title, m.date, m.source, "
+            "d.text AS snippet FROM docs d JOIN meetings m ON m.id = d.meeting_id "
+            f"WHERE d.id IN ({','.join('?' * len(top))})",
+            [int(ids[i]) for i in top],
+        ).fetchall()
+        by_id = {row["doc_id"]: row for row in rows}
+        return [dict(by_id[int(ids[i])], score=float(scores[i])) for i in top if int(ids[i]) in by_id]
+
+    def search(self, query, limit=10, mode="fulltext", kinds=None, since=None, until=None):
+        """Return the best-matching documents as dicts, most relevant first.
+
+        `mode` is "fulltext" (BM25 over FTS5), "semantic" (cosine similarity
+        over embeddings) or "hybrid" (reciprocal rank fusion of both).
+        `since`/`until` are inclusive YYYY-MM-DD bounds on the meeting date.
+        """
+        with self._connect() as conn:
+            if mode == "fulltext":
+                return [dict(row) for row in self._fulltext(conn, query, limit, kinds, since, until)]
+            if mode == "semantic":
+                return self._semantic(conn, query, limit, kinds, since, until)
+            if mode != "hybrid":
+                raise ValueError(f"Unknown search mode {mode!r}")
+            fused = {}
+            for hits in (self._fulltext(conn, query, limit * 2, kinds, since, until),
+                         self._semantic(conn, query, limit * 2, kinds, since, until)):
+                for rank, hit in enumerate(hits):
+                    entry = fused.setdefault(hit["doc_id"], dict(hit, score=0.0))
+                    entry["score"] += 1.0 / (60 + rank)
+            return sorted(fused.values(), key=lambda hit: -hit["score"])[:limit]
+
+    def stats(self):
+        with self._connect() as conn:
+            return {
+                "meetings": conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0],
+                "documents": conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0],
+                "vectors": conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0],
+            }
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Shared index, opened on first use"""
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = SearchIndex()
+        return _search_index
+
+
+def format_hits(hits):
+    """Render search results as markdown for the UI and CLI"""
+    if not hits:
+        return "No matches."
+    lines = []
+    for hit in hits:
+        where = f" @ {int(hit['start'] // 60)}:{int(hit['start'] % 60):02d}" if hit["start"] is not None else ""
+        lines.append(f"- **{hit['title'] or hit['meeting_id']}** ({hit['date']}, {hit['kind']}{where}): "
+                     f"{hit['snippet']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index and search past meeting minutes and transcripts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index_cmd = commands.add_parser("index", help="Index minutes/transcript files and directories")
+    index_cmd.add_argument("paths", nargs="*", default=["output", "recordings"])
+    query_cmd = commands.add_parser("query", help="Search the index")
+    query_cmd.add_argument("text")
+    query_cmd.add_argument("--mode", choices=("fulltext", "semantic", "hybrid"), default="fulltext")
+    query_cmd.add_argument("--kind", action="append", choices=KINDS, help="Restrict to a document kind")
+    query_cmd.add_argument("--since", help="Earliest meeting date, YYYY-MM-DD")
+    query_cmd.add_argument("--until", help="Latest meeting date, YYYY-MM-DD")
+    query_cmd.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    index = get_search_index()
+    if args.command == "index":
+        print(index.index_paths(args.paths), index.stats())
+    else:
+        started = time.perf_counter()
+        hits = index.search(args.text, args.limit, args.mode, args.kind, args.since, args.until)
+        print(format_hits(hits))
+        print(f"\n{len(hits)} hits in {(time.perf_counter() - started) * 1000:.1f} ms")
@@ -0,0 +1,131 @@
+import asyncio
+import inspect
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Budget for transcript text in a single prompt, leaving room for
+# instructions and the model's answer in llama3's 8k context
+CHUNK_TOKENS = int(os.environ.get("SUMMARY_CHUNK_TOKENS", "3000"))
+MAX_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "4"))
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def group_by_budget(pieces, max_tokens=CHUNK_TOKENS):
+    """Greedily pack consecutive text pieces into groups under the token budget"""
+    groups, current, used = [], [], 0
+    for piece in pieces:
+        cost = estimate_tokens(piece)
+        if current and used + cost > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(piece)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def split_oversized(pieces, max_tokens=CHUNK_TOKENS):
+    """Yield the pieces, splitting any that alone exceed the budget on word boundaries"""
+    for piece in pieces:
+        if estimate_tokens(piece) <= max_tokens:
+            yield piece
+        else:
+            yield from (" ".join(group) for group in group_by_budget(piece.split(), max_tokens))
+
+
+def chunk_segments(segments, max_tokens=CHUNK_TOKENS):
+    """Split timed segments into prompt-sized chunks, breaking a segment only if it alone is too long"""
+    lines = [f"[{format_timestamp(s.start)}] {s.text}" for s in segments if s.text]
+    return ["\n".join(group) for group in group_by_budget(split_oversized(lines, max_tokens), max_tokens)]
+
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS):
+    """Split a flat transcript into prompt-sized chunks on sentence boundaries.
+
+    Unpunctuated stretches (Whisper sometimes emits none for minutes) are
+    split on words instead, so no chunk exceeds the budget.
+    """
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    return [" ".join(group) for group in group_by_budget(split_oversized(sentences, max_tokens), max_tokens)]
+
+
+def map_reduce(chunks, map_fn, reduce_fn, max_workers=MAX_WORKERS, max_tokens=CHUNK_TOKENS):
+    """Summarize chunks concurrently, then combine the partial summaries.
+
+    `map_fn` turns one chunk of text into a partial summary and is run on a
+    bounded thread pool. If the partials together still exceed the budget
+    they are grouped and summarized again, so the final `reduce_fn` call
+    always receives a prompt-sized list of partials.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        partials = list(pool.map(map_fn, chunks))
+        while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > max_tokens:
+            groups = group_by_budget(partials, max_tokens)
+            if len(groups) == len(partials):
+                break
+            partials = list(pool.map(map_fn, ["\n\n".join(group) for group in groups]))
+    return reduce_fn(partials)
+
+
+async def amap_reduce(chunks, map_fn, reduce_fn, max_workers=MAX_WORKERS, max_tokens=CHUNK_TOKENS):
+    """map_reduce for coroutine functions; cancelling the caller cancels every in-flight chunk.
+
+    `reduce_fn` may be a plain function (e.g. one that only builds the final
+    prompt) or a coroutine function.
+    """
+    limit = asyncio.Semaphore(max_workers)
+
+    async def run(chunk):
+        async with limit:
+            return await map_fn(chunk)
+
+    partials = await asyncio.gather(*map(run, chunks))
+    while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > max_tokens:
+        groups = group_by_budget(partials, max_tokens)
+        if len(groups) == len(partials):
+            break
+        partials = await asyncio.gather(*(run("\n\n".join(group)) for group in groups))
+    result = reduce_fn(list(partials))
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def dedupe_action_items(items):
+    """Drop action items repeated across chunk summaries (same assignee and task)"""
+    seen = set()
+    unique = []
+    for item in items:
+        key = (_normalize(item.assignee), _normalize(item.description))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(item)
+    return unique
+
+
+def dedupe_strings(values):
+    seen = set()
+    unique = []
+    for value in values:
+        key = _normalize(value)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(value)
+    return unique
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules import each other as top-level siblings, as when run from this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
@@ -0,0 +1,67 @@
+import wave
+
+import pytest
+
+import tracing
+from audio_recorder import CHUNK, INPUT_OVERFLOW, RATE, SAMPLE_WIDTH, FakeSource, Recorder
+
+
+def pcm_blocks(seconds, overflow_every=0):
+    """`seconds` of a 16-bit sawtooth in CHUNK-frame blocks, every `overflow_every`-th flagged as an overflow"""
+    samples = bytearray()
+    for i in range(int(seconds * RATE)):
+        samples += ((i * 37) % 65536 - 32768).to_bytes(SAMPLE_WIDTH, "little", signed=True)
+    step = CHUNK * SAMPLE_WIDTH
+    blocks = [bytes(samples[i:i + step]) for i in range(0, len(samples), step)]
+    if overflow_every:
+        blocks = [(block, INPUT_OVERFLOW) if n % overflow_every == 0 else block
+                  for n, block in enumerate(blocks, 1)]
+    return bytes(samples), blocks
+
+
+def record(tmp_path, source, **subscribe_kwargs):
+    recorder = Recorder(output_dir=str(tmp_path), source=source)
+    subscriber = recorder.subscribe(**subscribe_kwargs) if subscribe_kwargs else None
+    recorder.start()
+    assert source.finished.wait(30)
+    recorder.stop()
+    return recorder, subscriber
+
+
+def test_records_every_sample_into_a_valid_wav(tmp_path):
+    seconds = 3
+    pcm, blocks = pcm_blocks(seconds, overflow_every=10)
+    recorder, _ = record(tmp_path, FakeSource(blocks))
+
+    with wave.open(recorder.path, "rb") as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, SAMPLE_WIDTH, RATE)
+        assert wav.getnframes() == seconds * RATE
+        assert wav.readframes(wav.getnframes()) == pcm
+    stats = recorder.stats()
+    assert stats["frames_written"] == seconds * RATE and stats["dropped_frames"] == 0
+    assert stats["callbacks"] == len(blocks)
+    assert stats["overflows"] == len(blocks) // 10
+
+
+@pytest.fixture
+def traced():
+    tracing.configure(enabled=True)
+    tracing.reset()
+    yield
+    tracing.configure(enabled=False)
+    tracing.reset()
+
+
+def test_slow_subscriber_drops_and_counts_the_oldest_audio(tmp_path, traced):
+    pcm, blocks = pcm_blocks(1)
+    # Paced like a microphone so the writer hands the subscriber many small blocks
+    recorder, subscriber = record(tmp_path, FakeSource(blocks, realtime=True), buffer_seconds=0.25)
+
+    # The subscriber never read while recording; only the newest audio is left
+    received = b"".join(iter(subscriber.get, None))
+    assert subscriber.dropped_bytes > 0
+    assert subscriber.dropped_bytes + len(received) == len(pcm)
+    assert pcm.endswith(received)
+    assert recorder.stats()["frames_written"] == RATE
+    dropped_seconds = tracing.counters()[("subscriber_dropped_seconds", ())]
+    assert dropped_seconds == pytest.approx(subscriber.dropped_bytes / (RATE * SAMPLE_WIDTH))
@@ -0,0 +1,33 @@
+import re
+
+from diarization import FILLERS, Turn, assign_text, compact_text, render_timeline
+from long_form import Segment
+
+TRANSCRIPT = ("Um, so so we we we need to, uh, decide on the launch date. Hmm. "
+              "I I I think that that date is fine, erm, but marketing needs two more weeks.")
+
+
+def content_words(text):
+    """Lower-cased words other than fillers, in order, with runs of one word collapsed"""
+    words = re.findall(r"[\w']+", FILLERS.sub(" ", text).lower())
+    return [w for i, w in enumerate(words) if i == 0 or w != words[i - 1]]
+
+
+def test_compact_text_drops_only_fillers_and_stutters():
+    compact = compact_text(TRANSCRIPT)
+    assert not FILLERS.search(compact)
+    assert "we we we" not in compact and "that that" in compact
+    assert content_words(compact) == content_words(TRANSCRIPT)
+
+
+def test_timeline_keeps_every_content_word():
+    words = TRANSCRIPT.split()
+    half = len(words) // 2
+    segments = [Segment(0.0, 4.0, " ".join(words[:half]), chunks=[[0.0, 4.0, " ".join(words[:half])]]),
+                Segment(4.0, 9.0, " ".join(words[half:]), chunks=[[4.0, 9.0, " ".join(words[half:])]])]
+    # Turn boundaries fall mid-phrase, and the last speaker comes back
+    turns = assign_text([Turn(0, 0.0, 2.5), Turn(1, 2.5, 6.0), Turn(0, 6.0, 9.0)], segments)
+    assert [turn.speaker for turn in turns] == ["S1", "S2", "S1"]
+    timeline = " ".join(turn.text for turn in turns)
+    assert content_words(timeline) == content_words(TRANSCRIPT)
+    assert render_timeline(turns).startswith("[00:00] S1: ")
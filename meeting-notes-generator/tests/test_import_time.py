@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+from import_time import DEFERRED, IMPORT_TIME_BUDGET
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "eager": [name for name in %r if name in sys.modules]}))
+"""
+
+
+def test_import_app_is_fast_and_defers_heavy_packages():
+    result = subprocess.run([sys.executable, "-c", PROBE % (DEFERRED,)], capture_output=True, text=True,
+                            cwd=APP_DIR, check=True)
+    report = json.loads(result.stdout.splitlines()[-1])
+    assert report["eager"] == []
+    assert report["seconds"] <= IMPORT_TIME_BUDGET
@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from job_queue import CANCELLED, DONE, JobQueue, QueueFull
+
+
+def test_cancelled_jobs_free_their_pending_slot():
+    queue = JobQueue({"transcribe": 1}, max_pending=2)
+    release = threading.Event()
+    running = queue.submit("transcribe", lambda job: release.wait())
+    while running.status != "running":
+        running.wait(0.01)
+
+    first = queue.submit("transcribe", lambda job: "first")
+    second = queue.submit("transcribe", lambda job: "second")
+    assert (first.position, second.position) == (1, 2)
+    with pytest.raises(QueueFull):
+        queue.submit("transcribe", lambda job: "refused")
+
+    first.cancel()
+    assert first.finished and first.status == CANCELLED
+    assert queue.pending("transcribe") == 1 and second.position == 1
+    third = queue.submit("transcribe", lambda job: "third")
+
+    release.set()
+    for job in (running, second, third):
+        assert job.wait(5) and job.status == DONE
+    assert (second.result, third.result) == ("second", "third")
+
+
+def test_direct_stage_users_share_the_job_slots():
+    queue = JobQueue({"transcribe": 1}, max_pending=2)
+    with queue.slot("transcribe"):
+        job = queue.submit("transcribe", lambda job: "done")
+        assert not job.wait(0.2) and job.status != "running"
+    assert job.wait(5) and job.result == "done"
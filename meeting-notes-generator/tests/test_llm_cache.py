@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+import llm_cache
+from llm_cache import ResponseCache
+
+
+def test_acached_call_keeps_sqlite_off_the_event_loop(monkeypatch, tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.db"))
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *a, _m=method: threads.append(threading.get_ident()) or _m(*a))
+    monkeypatch.setattr(llm_cache, "response_cache", cache)
+    monkeypatch.setattr(llm_cache, "CACHE_ENABLED", True)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "minutes"
+
+    async def main():
+        loop_thread = threading.get_ident()
+        first = await llm_cache.acached_call("key", call)
+        second = await llm_cache.acached_call("key", call)
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(main())
+    assert first == second == "minutes"
+    assert len(calls) == 1
+    assert len(threads) == 3 and loop_thread not in threads
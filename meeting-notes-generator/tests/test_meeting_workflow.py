@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("agno")
+
+import meeting_workflow
+from long_form import Segment
+from meeting_workflow import ActionItem, MeetingMinutes, MeetingNotesWorkflow
+from search_index import SearchIndex
+
+MINUTES = MeetingMinutes(
+    title="Launch planning", date="2026-03-01", participants=["S1", "S2"],
+    key_points=["Marketing needs two more weeks"],
+    action_items=[ActionItem(assignee="S2", description="Prepare the release notes")],
+    decisions=["Move the launch to the first of March"], summary="The launch moves.", raw_transcript="",
+)
+
+
+def test_workflow_run_is_indexed_with_its_recording(monkeypatch, tmp_path):
+    wav_path = str(tmp_path / "standup.wav")
+    segments = [Segment(0.0, 4.0, "We agreed to move the launch to the first of March.")]
+    monkeypatch.setattr(MeetingNotesWorkflow, "transcribe_with_segments",
+                        lambda self, path, progress=None, use_cache=True: (segments[0].text, segments))
+    monkeypatch.setattr(MeetingNotesWorkflow, "generate_minutes", lambda self, *args: MINUTES)
+    index = SearchIndex(str(tmp_path / "index.db"), embeddings=False)
+    monkeypatch.setattr(meeting_workflow, "get_search_index", lambda: index)
+
+    workflow = MeetingNotesWorkflow(session_id="standup")
+    assert [response.content for response in workflow.run(wav_path)] == [MINUTES]
+    assert workflow.session_state["audio_path"] == wav_path
+
+    # Re-indexing from storage, as `search_index.py index` does, keeps the link to the recording
+    rebuilt = SearchIndex(str(tmp_path / "rebuilt.db"), embeddings=False)
+    storage = SimpleNamespace(get_all_sessions=lambda: [
+        SimpleNamespace(session_id=workflow.session_id, session_data={"session_state": workflow.session_state}),
+    ])
+    assert rebuilt.index_storage(storage) == 1
+    for db in (index, rebuilt):
+        hits = db.search("launch", kinds=["decision"])
+        assert hits and all(hit["meeting_id"] == "standup" and hit["source"] == wav_path for hit in hits)
@@ -0,0 +1,25 @@
+from long_form import Segment
+from summarize import chunk_segments, chunk_text, estimate_tokens
+
+
+def test_unpunctuated_transcript_is_split_on_words():
+    words = [f"word{i}" for i in range(3000)]
+    text = " ".join(words)
+    chunks = chunk_text(text, max_tokens=500)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+    assert " ".join(chunks).split() == words
+
+
+def test_sentences_stay_whole_when_they_fit():
+    text = "We moved the launch. Marketing needs two weeks! Who owns the release notes?"
+    assert chunk_text(text, max_tokens=8) == ["We moved the launch.", "Marketing needs two weeks!",
+                                              "Who owns the release notes?"]
+
+
+def test_oversized_segment_is_split_on_words():
+    segments = [Segment(0.0, 30.0, "short opening"), Segment(30.0, 600.0, " ".join(["monologue"] * 1000))]
+    chunks = chunk_segments(segments, max_tokens=300)
+    assert chunks[0].startswith("[00:00] short opening\n[00:30] monologue")
+    assert all(estimate_tokens(chunk) <= 300 for chunk in chunks)
+    assert sum(chunk.split().count("monologue") for chunk in chunks) == 1000
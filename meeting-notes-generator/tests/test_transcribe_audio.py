@@ -0,0 +1,12 @@
+import os
+
+from conftest import FIXTURES
+from transcribe_audio import transcript_key
+
+SPEECH = os.path.join(FIXTURES, "speech.wav")
+
+
+def test_live_and_offline_transcripts_are_cached_apart():
+    offline = transcript_key(SPEECH, "openai/whisper-base", vad=True)
+    assert transcript_key(SPEECH, "openai/whisper-base", vad=True, windowing="offline") == offline
+    assert transcript_key(SPEECH, "openai/whisper-base", vad=True, windowing="live") != offline
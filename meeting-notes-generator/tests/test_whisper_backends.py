@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from whisper_backends import BACKENDS, word_error_rate
+
+# Synthesized (espeak-ng) reading of speech.txt, 16 kHz mono
+SPEECH = os.path.join(FIXTURES, "speech.wav")
+TOLERANCE = float(os.environ.get("BACKEND_WER_TOLERANCE", "0.1"))
+
+
+def test_word_error_rate():
+    assert word_error_rate("move the launch", "move the launch") == 0.0
+    assert word_error_rate("move the launch", "move launch") == pytest.approx(1 / 3)
+    assert word_error_rate("", "") == 0.0
+
+
+@pytest.fixture(scope="module")
+def transcribe():
+    """transcribe_segments on the fixture, skipping when torch or the Whisper weights aren't available"""
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from transcribe_audio import transcribe_segments
+
+    texts = {}
+
+    def run(backend):
+        if backend not in texts:
+            try:
+                texts[backend] = transcribe_segments(SPEECH, backend=backend, use_cache=False)[0]
+            except OSError as e:  # weights neither cached nor downloadable
+                pytest.skip(f"Whisper weights unavailable: {e}")
+        return texts[backend]
+
+    return run
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_backend_matches_fp32(transcribe, backend):
+    if not BACKENDS[backend].available():
+        pytest.skip(f"{backend} backend needs {', '.join(BACKENDS[backend].requires)}")
+    reference = transcribe("hf")
+    assert word_error_rate(reference, transcribe(backend)) <= TOLERANCE
+
+
+def test_fp32_transcribes_the_fixture(transcribe):
+    with open(os.path.join(FIXTURES, "speech.txt"), encoding="utf-8") as f:
+        expected = f.read()
+    normalize = lambda text: " ".join("".join(c for c in text.lower() if c.isalnum() or c.isspace()).split())
+    # Loose: the fixture is synthetic speech; this only guards against a broken reference
+    assert word_error_rate(normalize(expected), normalize(transcribe("hf"))) <= 0.3
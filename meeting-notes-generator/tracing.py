@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_enabled = False
+_exporters = []
+_counters = defaultdict(float)
+_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "attributes", "start", "duration", "_t0")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.start = None
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._t0
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        for exporter in _exporters:
+            exporter.export_span(self)
+        return False
+
+    def to_dict(self):
+        return {"span": self.name, "start": self.start, "duration": self.duration, **self.attributes}
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def enabled():
+    return _enabled
+
+
+def span(name, **attributes):
+    """Time a stage: `with span("whisper.generate", batch=8): ...`
+
+    Returns a shared no-op object when tracing is disabled, so
+    instrumented code pays only a function call and a flag check.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def count(name, value=1, **labels):
+    """Add to a counter, e.g. count("audio_seconds", 12.5, stage="transcribe")"""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += value
+
+
+def add_time(stage, seconds):
+    """Accumulate time for hot loops where a span per iteration would be too chatty"""
+    count("loop_seconds", seconds, stage=stage)
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def configure(enabled=True, exporters=()):
+    """Turn tracing on or off and replace the exporters"""
+    global _enabled, _exporters
+    _exporters = list(exporters)
+    _enabled = enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+class InMemoryExporter:
+    """Keeps finished spans in a list, for tests and the benchmark"""
+
+    def __init__(self):
+        self.spans = []
+
+    def export_span(self, span):
+        self.spans.append(span.to_dict())
+
+    def durations(self, name):
+        return [s["duration"] for s in self.spans if s["span"] == name]
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per finished span to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export_span(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+
+class PrometheusExporter:
+    """Aggregates span durations and renders them with the counters in Prometheus text format"""
+
+    def __init__(self, prefix="meeting_notes"):
+        self.prefix = prefix
+        self._durations = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+        self._server = None
+
+    def export_span(self, span):
+        with self._lock:
+            entry = self._durations[span.name]
+            entry[0] += 1
+            entry[1] += span.duration
+
+    @staticmethod
+    def _labels(pairs):
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# TYPE {self.prefix}_stage_seconds summary"]
+        with self._lock:
+            for name, (n, total) in sorted(self._durations.items()):
+                labels = self._labels([("stage", name)])
+                lines.append(f"{self.prefix}_stage_seconds_count{labels} {n}")
+                lines.append(f"{self.prefix}_stage_seconds_sum{labels} {total}")
+        by_name = defaultdict(list)
+        for (name, labels), value in sorted(counters().items()):
+            by_name[name].append((labels, value))
+        for name, series in by_name.items():
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines += [f"{metric}{self._labels(labels)} {value}" for labels, value in series]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """Expose /metrics on a background HTTP server"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server
+
+
+def configure_from_env():
+    """TRACING_JSONL=<path> and/or TRACING_PROMETHEUS_PORT=<port> turn tracing on"""
+    exporters = []
+    if os.environ.get("TRACING_JSONL"):
+        exporters.append(JsonLinesExporter(os.environ["TRACING_JSONL"]))
+    if os.environ.get("TRACING_PROMETHEUS_PORT"):
+        prometheus = PrometheusExporter()
+        prometheus.serve(int(os.environ["TRACING_PROMETHEUS_PORT"]))
+        exporters.append(prometheus)
+    if exporters:
+        configure(True, exporters)
+    return exporters
@@ -1,47 +1,194 @@
+import asyncio
 import os
-import wave
-import numpy as np
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
-
-def transcribe_audio(audio_path):
-    # Initialize processor and model
-    processor = WhisperProcessor.from_pretrained("openai/whisper-base")
-    model = WhisperForConditionalGeneration.from_pretrained("openai/whisper-base")
-    
-    # Load audio using wave
-    with wave.open(audio_path, 'rb') as wf:
-        # Get audio properties
-        frames = wf.getnframes()
-        rate = wf.getframerate()
-        
-        # Read raw audio data
-        raw_data = wf.readframes(frames)
-        
-    # Convert to numpy array and normalize
-    audio = np.frombuffer(raw_data, dtype=np.int16).astype(np.float32) / 32768.0
-    
-    # Resample to 16kHz if needed
-    if rate != 16000:
-        audio = np.interp(
-            np.linspace(0, len(audio), int(len(audio) * 16000 / rate)),
-            np.arange(len(audio)),
-            audio
+from dataclasses import asdict
+from functools import partial
+import tracing
+from audio_io import iter_audio_blocks, wav_info
+from job_queue import CANCELLED, DONE, get_job_queue
+from model_registry import DEFAULT_MODEL, get_whisper
+from long_form import BATCH_SIZE, OVERLAP_SECONDS, WINDOW_SECONDS, Segment, transcribe_long_form
+from transcript_cache import audio_fingerprint, cache_key, transcript_cache
+from vad import VAD_ENABLED, VoiceActivityDetector
+from whisper_backends import WHISPER_BACKEND
+
+
+class TranscriptionCancelled(Exception):
+    pass
+
+
+def _settle(future, job):
+    if future.done():
+        return
+    if job.status == DONE:
+        future.set_result(job.result)
+    elif job.status == CANCELLED:
+        future.set_exception(TranscriptionCancelled())
+    else:
+        future.set_exception(job.error)
+
+
+async def run_transcription(fn, *args, progress=None, on_submit=None, **kwargs):
+    """Queue a blocking transcription `fn` on the job queue's transcribe stage and await it.
+
+    `fn` must accept a `progress` callback. `on_submit` receives the Job,
+    whose `position` tracks its place in line. Raises QueueFull when
+    JOB_QUEUE_MAX_PENDING transcriptions are already waiting. Cancelling the
+    awaiting task drops the job if it hasn't started yet, or stops it at the
+    next decoded batch, so a disconnected client doesn't keep Whisper busy.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def run(job):
+        def on_progress(fraction):
+            # Raises JobCancelled once the job has been cancelled
+            job.report(progress=fraction)
+            if progress is not None:
+                progress(fraction)
+        return fn(*args, progress=on_progress, **kwargs)
+
+    def on_done(job):
+        try:
+            loop.call_soon_threadsafe(_settle, future, job)
+        except RuntimeError:
+            pass  # the awaiting loop is already closed
+
+    job = get_job_queue().submit("transcribe", run)
+    if on_submit is not None:
+        on_submit(job)
+    job.add_done_callback(on_done)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        job.cancel()
+        raise
+
+def transcribe_segments(audio_path, model_name=DEFAULT_MODEL, device=None, dtype=None,
+                        batch_size=BATCH_SIZE, vad=VAD_ENABLED, stats=None, use_cache=True,
+                        progress=None, backend=WHISPER_BACKEND):
+    """Transcribe a recording of any length, returning (text, segments).
+
+    With `vad` enabled silence is dropped before Whisper and segment times
+    are mapped back onto the original recording. Pass a dict as `stats`
+    to receive how much audio was skipped. `progress` is called with the
+    fraction of the recording decoded so far. Results are cached by audio
+    content and decoding config, so re-running on the same recording
+    skips Whisper entirely.
+    """
+    with tracing.span("transcribe", audio=os.path.basename(audio_path), backend=backend) as span:
+        text, segments, vad_stats, cached = _transcribe_segments(
+            audio_path, model_name, device, dtype, batch_size, vad, use_cache, progress, backend
         )
-    
-    # Process audio
-    input_features = processor(audio, sampling_rate=16000, return_tensors="pt").input_features
-    
-    # Generate transcription
-    predicted_ids = model.generate(input_features)
-    transcription = processor.batch_decode(predicted_ids, skip_special_tokens=True)[0]
-    
+        span.set(cached=cached, segments=len(segments))
+    if stats is not None:
+        stats.update(vad_stats, **({"cached": True} if cached else {}))
+    if not cached:
+        if tracing.enabled():
+            info = wav_info(audio_path)
+            tracing.count("audio_seconds", info["frames"] / info["rate"], stage="transcribe")
+        tracing.count("vad_skipped_seconds", vad_stats.get("skipped_seconds", 0.0))
+    tracing.count("transcriptions", cached=str(cached).lower())
+    return text, segments
+
+
+def transcript_key(audio_path, model_name=DEFAULT_MODEL, dtype=None, backend=WHISPER_BACKEND, vad=VAD_ENABLED,
+                   windowing="offline"):
+    """Cache key for a recording's transcript under a given decoding config.
+
+    `windowing` is "offline" for transcribe_audio and "live" for LiveTranscriber,
+    which decodes window by window as audio arrives, so the two never share an entry.
+    """
+    return cache_key(
+        audio_fingerprint(audio_path), model=model_name, dtype=dtype, backend=backend, vad=vad,
+        window=WINDOW_SECONDS, overlap=OVERLAP_SECONDS, windowing=windowing,
+    )
+
+
+def store_transcript(key, text, segments, stats):
+    transcript_cache.put(key, {
+        "text": text,
+        "segments": [asdict(segment) for segment in segments],
+        "stats": stats,
+    })
+
+
+def _transcribe_segments(audio_path, model_name, device, dtype, batch_size, vad, use_cache,
+                         progress, backend):
+    key = None
+    if use_cache:
+        key = transcript_key(audio_path, model_name, dtype, backend, vad)
+        cached = transcript_cache.get(key)
+        if cached is not None:
+            segments = [Segment(**segment) for segment in cached["segments"]]
+            return cached["text"], segments, cached["stats"], True
+
+    # Shared processor and model, loaded once per process
+    processor, model = get_whisper(model_name, device, dtype, backend)
+    # Stream 16 kHz mono blocks straight into the windowing so memory stays flat
+    blocks = iter_audio_blocks(audio_path)
+    detector = None
+    if vad:
+        detector = VoiceActivityDetector()
+        blocks = detector.iter_speech(blocks)
+
+    on_window = None
+    if progress is not None:
+        info = wav_info(audio_path)
+        duration = info["frames"] / info["rate"] or 1.0
+        # Decoded time is on the speech-only timeline when VAD is on, so this underestimates
+        on_window = lambda seconds: progress(min(seconds / duration, 1.0))
+
+    text, segments = transcribe_long_form(blocks, processor, model, batch_size=batch_size,
+                                          progress=on_window)
+
+    vad_stats = {}
+    if detector is not None:
+        detector.map_segments(segments)
+        vad_stats = detector.stats()
+    if key is not None:
+        store_transcript(key, text, segments, vad_stats)
+    return text, segments, vad_stats, False
+
+def transcribe_audio(audio_path, model_name=DEFAULT_MODEL, device=None, dtype=None,
+                     batch_size=BATCH_SIZE, progress=None, backend=WHISPER_BACKEND, use_cache=True,
+                     speakers=False):
+    """Transcribe and save `<recording>.txt`.
+
+    With `speakers`, the recording is also diarized and a speaker-turn
+    timeline ('[mm:ss] S1: ...') is saved as `<recording>.speakers.txt`
+    and returned instead of the flat text.
+    """
+    transcription, segments = transcribe_segments(audio_path, model_name, device, dtype, batch_size,
+                                                  progress=progress, backend=backend, use_cache=use_cache)
+
     # Save transcription to file
     output_path = os.path.splitext(audio_path)[0] + '.txt'
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(transcription)
-    
+
+    if speakers:
+        transcription = save_speaker_timeline(audio_path, segments)
+
     return transcription
 
+def save_speaker_timeline(audio_path, segments):
+    """Diarize the recording, save the timeline as `<recording>.speakers.txt` and return it"""
+    from diarization import diarize, render_timeline
+    timeline = render_timeline(diarize(audio_path, segments))
+    with open(os.path.splitext(audio_path)[0] + '.speakers.txt', 'w', encoding='utf-8') as f:
+        f.write(timeline)
+    return timeline
+
+async def atranscribe_segments(audio_path, progress=None, on_submit=None, **kwargs):
+    """Async transcribe_segments, queued off the event loop"""
+    return await run_transcription(partial(transcribe_segments, audio_path, **kwargs), progress=progress,
+                                   on_submit=on_submit)
+
+async def atranscribe_audio(audio_path, progress=None, on_submit=None, **kwargs):
+    """Async transcribe_audio, queued off the event loop"""
+    return await run_transcription(partial(transcribe_audio, audio_path, **kwargs), progress=progress,
+                                   on_submit=on_submit)
+
 if __name__ == "__main__":
     # Example usage
     audio_file = "/Users/aravindh/Documents/GitHub/applied-ai-apps/recordings/recording_20250305_215054.wav"
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import tempfile
+import wave
+
+# Bump whenever a change to the audio or decoding pipeline changes its output
+PIPELINE_VERSION = 2
+CACHE_DIR = os.environ.get(
+    "TRANSCRIPT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "transcripts"),
+)
+MAX_CACHE_BYTES = int(os.environ.get("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HASH_BLOCK_FRAMES = 1 << 16
+
+
+def audio_fingerprint(audio_path):
+    """Hash the PCM payload and format of a WAV file, ignoring header padding and metadata"""
+    digest = hashlib.sha256()
+    with wave.open(audio_path, 'rb') as wf:
+        digest.update(f"{wf.getframerate()}:{wf.getnchannels()}:{wf.getsampwidth()}".encode())
+        while True:
+            raw = wf.readframes(HASH_BLOCK_FRAMES)
+            if not raw:
+                break
+            digest.update(raw)
+    return digest.hexdigest()
+
+
+def cache_key(audio_hash, **config):
+    """Combine the audio hash with everything that affects the transcript"""
+    payload = json.dumps(
+        {"audio": audio_hash, "pipeline": PIPELINE_VERSION, "config": config},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TranscriptCache:
+    """Content-addressed on-disk store of transcripts and segment timestamps.
+
+    Each entry is one JSON file written through a temp file and an atomic
+    rename, so concurrent writers never expose a partial entry. Reads bump
+    the entry's mtime and the least recently used entries are evicted once
+    the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry
+
+    def put(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            os.remove(path)
+
+
+transcript_cache = TranscriptCache()
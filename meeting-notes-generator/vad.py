@@ -0,0 +1,167 @@
+import os
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "1") != "0"
+
+
+def frame_features(frames):
+    """Per-frame energy (dB) and spectral flatness for a (n, frame) array"""
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    power = np.abs(np.fft.rfft(frames * np.hanning(frames.shape[1]), axis=1)) ** 2 + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, flatness
+
+
+class VoiceActivityDetector:
+    """Energy/spectral-flatness VAD that streams speech-only audio.
+
+    Frames are speech when they are `threshold_db` above a tracked noise
+    floor and not noise-like (spectral flatness below `max_flatness`).
+    Speech regions are padded by `pad_ms`, gaps shorter than `min_gap_ms`
+    are bridged and regions shorter than `min_speech_ms` are dropped.
+    The regions kept are recorded so timestamps on the compacted audio
+    can be mapped back to the original recording.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, threshold_db=10.0,
+                 max_flatness=0.5, min_energy_db=-60.0, floor_rise_db=0.01,
+                 pad_ms=300, min_gap_ms=500, min_speech_ms=250):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.max_flatness = max_flatness
+        self.min_energy_db = min_energy_db
+        self.floor_rise_db = floor_rise_db
+        self.pad_frames = max(1, round(pad_ms / frame_ms))
+        self.hang_frames = self.pad_frames + max(1, round(min_gap_ms / frame_ms))
+        self.min_speech_frames = max(1, round(min_speech_ms / frame_ms))
+
+        self.regions = []          # (original_start, original_end) in samples
+        self._compact_starts = []  # compacted start sample of each region
+        self._compact_len = 0
+        self.total_samples = 0
+
+    def is_speech(self, frames):
+        energy_db, flatness = frame_features(frames)
+        floor = self._floor
+        if floor is None:
+            # Seed from the quietest frames so a recording that opens mid-sentence still counts
+            floor = float(np.percentile(energy_db, 10))
+        decisions = np.empty(len(frames), dtype=bool)
+        for i, energy in enumerate(energy_db):
+            floor = min(energy, floor + self.floor_rise_db)
+            decisions[i] = energy > floor + self.threshold_db
+        self._floor = floor
+        return decisions & (flatness < self.max_flatness) & (energy_db > self.min_energy_db)
+
+    def iter_speech(self, blocks, mark_boundaries=False):
+        """Yield speech-only audio chunks from a stream of blocks.
+
+        With `mark_boundaries`, a `None` is yielded after each speech region
+        closes so downstream windowing can decode it without waiting.
+        """
+        self._floor = None
+        remainder = np.zeros(0, dtype=np.float32)
+        frame_index = 0
+
+        pre = deque(maxlen=self.pad_frames)  # silence kept as leading padding
+        in_region = confirmed = False
+        start_frame = region_frames = speech_frames = 0
+        held = []      # region audio not yet emitted
+        trailing = []  # silence inside a region, kept only if speech resumes
+
+        def close():
+            kept = trailing[:self.pad_frames]
+            if confirmed:
+                if held or kept:
+                    yield np.concatenate(held + kept)
+                self._add_region(start_frame, region_frames + len(kept))
+                if mark_boundaries:
+                    yield None
+            pre.clear()
+            pre.extend(trailing[max(self.pad_frames, len(trailing) - self.pad_frames):])
+
+        for block in blocks:
+            block = np.asarray(block, dtype=np.float32)
+            self.total_samples += len(block)
+            audio = np.concatenate([remainder, block])
+            usable = len(audio) // self.frame * self.frame
+            remainder = audio[usable:]
+            if not usable:
+                continue
+            frames = audio[:usable].reshape(-1, self.frame)
+
+            for frame, speech in zip(frames, self.is_speech(frames)):
+                if not in_region:
+                    if speech:
+                        in_region, confirmed = True, False
+                        start_frame = frame_index - len(pre)
+                        held = list(pre) + [frame]
+                        region_frames, speech_frames = len(held), 1
+                        trailing = []
+                        pre.clear()
+                    else:
+                        pre.append(frame)
+                elif speech:
+                    held.extend(trailing)
+                    held.append(frame)
+                    region_frames += len(trailing) + 1
+                    speech_frames += 1
+                    trailing = []
+                else:
+                    trailing.append(frame)
+                    if len(trailing) >= self.hang_frames:
+                        yield from close()
+                        in_region, held, trailing = False, [], []
+                frame_index += 1
+
+                if in_region and speech_frames >= self.min_speech_frames:
+                    confirmed = True
+                if confirmed and in_region and held:
+                    yield np.concatenate(held)
+                    held = []
+
+        if in_region:
+            yield from close()
+
+    def _add_region(self, start_frame, num_frames):
+        start = start_frame * self.frame
+        length = num_frames * self.frame
+        self.regions.append((start, start + length))
+        self._compact_starts.append(self._compact_len)
+        self._compact_len += length
+
+    def to_original(self, seconds, end=False):
+        """Map a time on the compacted (speech-only) audio back to the recording"""
+        if not self.regions:
+            return seconds
+        sample = seconds * self.sample_rate
+        search = bisect_left if end else bisect_right
+        i = max(search(self._compact_starts, sample) - 1, 0)
+        return (self.regions[i][0] + sample - self._compact_starts[i]) / self.sample_rate
+
+    def map_segments(self, segments):
+        for segment in segments:
+            segment.start = self.to_original(segment.start)
+            segment.end = self.to_original(segment.end, end=True)
+            segment.chunks = [
+                [self.to_original(start), self.to_original(end, end=True), text]
+                for start, end, text in segment.chunks
+            ]
+        return segments
+
+    def stats(self):
+        total = self.total_samples / self.sample_rate
+        speech = self._compact_len / self.sample_rate
+        return {
+            "audio_seconds": total,
+            "speech_seconds": speech,
+            "skipped_seconds": total - speech,
+            "skipped_ratio": (total - speech) / total if total else 0.0,
+            "regions": len(self.regions),
+        }
@@ -0,0 +1,122 @@
+import os
+import struct
+import threading
+
+HEADER_SIZE = 44
+
+
+class RingBuffer:
+    """Fixed-capacity byte ring buffer.
+
+    Safe for one producer thread and one consumer thread without a lock:
+    the producer only advances `_head` and the consumer only advances
+    `_tail`. Writes that don't fit are dropped and counted rather than
+    blocking the producer.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._head = 0  # total bytes written
+        self._tail = 0  # total bytes read
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def free(self):
+        return self.capacity - len(self)
+
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        n = len(data)
+        if n > self.free():
+            self.dropped_bytes += n
+            return False
+        pos = self._head % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buf[pos:pos + first] = data[:first]
+        self._buf[:n - first] = data[first:]
+        self._head += n
+        return True
+
+    def read(self, max_bytes=None, align=1):
+        """Drain up to `max_bytes`, rounded down to a multiple of `align`"""
+        n = len(self)
+        if max_bytes is not None:
+            n = min(n, max_bytes)
+        n -= n % align
+        pos = self._tail % self.capacity
+        first = min(n, self.capacity - pos)
+        out = bytes(self._buf[pos:pos + first]) + bytes(self._buf[:n - first])
+        self._tail += n
+        return out
+
+
+class IncrementalWavWriter:
+    """PCM WAV writer that appends to one open file handle.
+
+    The RIFF and data chunk sizes are patched in place on every flush, so
+    the file on disk is a valid WAV containing everything written up to the
+    last flush, and each flush costs O(bytes since the previous flush).
+    """
+
+    def __init__(self, path, channels=1, sample_width=2, rate=16000, fsync=True):
+        self.path = path
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.fsync = fsync
+        self.data_bytes = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        block_align = self.channels * self.sample_width
+        self._file.seek(0)
+        self._file.write(struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + self.data_bytes, b'WAVE',
+            b'fmt ', 16, 1, self.channels, self.rate,
+            self.rate * block_align, block_align, self.sample_width * 8,
+            b'data', self.data_bytes,
+        ))
+
+    @property
+    def frames(self):
+        return self.data_bytes // (self.channels * self.sample_width)
+
+    @property
+    def duration(self):
+        return self.frames / self.rate
+
+    def write(self, data):
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(data)
+            self.data_bytes += len(data)
+
+    def flush(self):
+        """Patch the header sizes and push everything written so far to disk"""
+        with self._lock:
+            self._file.seek(4)
+            self._file.write(struct.pack('<I', 36 + self.data_bytes))
+            self._file.seek(40)
+            self._file.write(struct.pack('<I', self.data_bytes))
+            self._file.seek(0, os.SEEK_END)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,197 @@
+import importlib.util
+import os
+
+# Which implementation runs Whisper: "hf" (fp32 transformers), "int8"
+# (dynamically quantized torch, CPU) or "onnx" (ONNX Runtime, CPU)
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "hf")
+# Share of teacher-forced tokens on which int8 must pick the same argmax as fp32
+INT8_MIN_AGREEMENT = float(os.environ.get("INT8_MIN_AGREEMENT", "0.95"))
+
+
+class WhisperBackend:
+    """Loads a Whisper processor and a model exposing `generate(input_features)`.
+
+    Every backend returns the same (processor, model) pair shape, so the
+    windowing and batched decoding in long_form work unchanged.
+    """
+
+    name = None
+    # Optional packages the backend needs beyond requirements.txt
+    requires = ()
+
+    def available(self):
+        return all(importlib.util.find_spec(module) is not None for module in self.requires)
+
+    def load(self, model_name, device, dtype):
+        raise NotImplementedError
+
+
+class HFBackend(WhisperBackend):
+    name = "hf"
+
+    def load(self, model_name, device, dtype):
+        from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+        processor = WhisperProcessor.from_pretrained(model_name)
+        model = WhisperForConditionalGeneration.from_pretrained(
+            model_name, torch_dtype=dtype
+        ).to(device)
+        model.eval()
+        return processor, model
+
+
+class QuantizedTorchBackend(WhisperBackend):
+    """fp32 weights with nn.Linear layers dynamically quantized to int8 (CPU only)"""
+
+    name = "int8"
+
+    def load(self, model_name, device, dtype):
+        import torch
+        from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+        if str(device) != "cpu":
+            raise ValueError("The int8 backend runs on CPU only")
+        processor = WhisperProcessor.from_pretrained(model_name)
+        model = WhisperForConditionalGeneration.from_pretrained(model_name, torch_dtype=torch.float32)
+        model.eval()
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return processor, model
+
+
+class OnnxBackend(WhisperBackend):
+    """ONNX Runtime encoder/decoder export; the decoder reuses its KV cache between steps"""
+
+    name = "onnx"
+    requires = ("optimum", "onnxruntime")
+
+    def load(self, model_name, device, dtype):
+        if not self.available():
+            raise ImportError("The onnx backend needs optimum and ONNX Runtime: pip install 'optimum[onnxruntime]'")
+        from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+        from transformers import WhisperProcessor
+
+        if str(device) != "cpu":
+            raise ValueError("The onnx backend runs on CPU only")
+        processor = WhisperProcessor.from_pretrained(model_name)
+        model = ORTModelForSpeechSeq2Seq.from_pretrained(
+            model_name, export=True, use_cache=True, provider="CPUExecutionProvider"
+        )
+        return processor, model
+
+
+BACKENDS = {backend.name: backend for backend in (HFBackend(), QuantizedTorchBackend(), OnnxBackend())}
+
+
+def get_backend(name=WHISPER_BACKEND):
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown Whisper backend {name!r}; expected one of {sorted(BACKENDS)}")
+
+
+def default_device(name=WHISPER_BACKEND):
+    if name != "hf":
+        return "cpu"
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def compare_backends(audio_path, backends=None, reference="hf", tolerance=0.1):
+    """Transcribe one file with each backend and report WER against the reference backend.
+
+    By default every backend whose optional packages are installed is compared.
+    """
+    from transcribe_audio import transcribe_segments
+
+    if backends is None:
+        backends = tuple(name for name, backend in BACKENDS.items() if backend.available())
+    texts = {
+        name: transcribe_segments(audio_path, backend=name, use_cache=False)[0]
+        for name in dict.fromkeys((reference,) + tuple(backends))
+    }
+    results = {}
+    for name, text in texts.items():
+        wer = word_error_rate(texts[reference], text)
+        results[name] = {"wer": wer, "within_tolerance": wer <= tolerance, "text": text}
+    return results
+
+
+def check_int8(audio_path=None, model_name=None, seconds=10.0, min_agreement=INT8_MIN_AGREEMENT):
+    """Compare the int8 model's output with fp32 on one window, without needing a transcript.
+
+    Both models are teacher-forced on fp32's greedy decode of the same
+    features, so one early difference can't snowball into a different
+    transcript. Reports the share of positions where int8 picks the same
+    next token and the mean cosine similarity of the two models' logits.
+    Without `audio_path` a synthetic speech-like fixture is used.
+    """
+    import tempfile
+
+    import torch
+    from audio_io import load_audio
+    from model_registry import DEFAULT_MODEL
+
+    model_name = model_name or DEFAULT_MODEL
+    if audio_path is None:
+        from benchmark import synthesize_wav
+
+        with tempfile.TemporaryDirectory() as tmp:
+            audio_path = os.path.join(tmp, "fixture.wav")
+            synthesize_wav(audio_path, seconds, 16000)
+            audio = load_audio(audio_path)
+    else:
+        audio = load_audio(audio_path)[:int(seconds * 16000)]
+
+    processor, reference = get_backend("hf").load(model_name, "cpu", torch.float32)
+    _, quantized = get_backend("int8").load(model_name, "cpu", torch.float32)
+    features = processor(audio, sampling_rate=16000, return_tensors="pt").input_features
+    with torch.inference_mode():
+        decoder_ids = reference.generate(features)
+        expected = reference(input_features=features, decoder_input_ids=decoder_ids).logits
+        actual = quantized(input_features=features, decoder_input_ids=decoder_ids).logits
+    agreement = (expected.argmax(-1) == actual.argmax(-1)).float().mean().item()
+    cosine = torch.nn.functional.cosine_similarity(expected, actual, dim=-1).mean().item()
+    return {"tokens": decoder_ids.shape[1], "agreement": agreement, "logit_cosine": cosine,
+            "ok": agreement >= min_agreement}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["--check-int8"]:
+        result = check_int8(sys.argv[2] if len(sys.argv) > 2 else None)
+        status = "ok" if result["ok"] else "MISMATCH"
+        print(f"int8 vs fp32 over {result['tokens']} tokens: agreement {result['agreement']:.3f}, "
+              f"logit cosine {result['logit_cosine']:.4f} [{status}]")
+        sys.exit(0 if result["ok"] else 1)
+
+    if len(sys.argv) < 2:
+        print("Usage: python whisper_backends.py <wav_file> [tolerance]")
+        print("       python whisper_backends.py --check-int8 [wav_file]")
+        sys.exit(1)
+
+    tolerance = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    results = compare_backends(sys.argv[1], tolerance=tolerance)
+    for name, result in results.items():
+        status = "ok" if result["within_tolerance"] else "MISMATCH"
+        print(f"{name:>5}: WER {result['wer']:.3f} [{status}]")
+    sys.exit(0 if all(r["within_tolerance"] for r in results.values()) else 1)